@@ -0,0 +1,250 @@
+import argparse
+import asyncio
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Callable
+
+import aiohttp
+
+from benchmarks.fake_gitlab import (
+    PROJECT_PATH,
+    add_scenario_arguments,
+    scenario_from_arguments,
+)
+
+# the scheduler has to stay quiet this long before the screen counts as loaded
+SETTLE_SEC = 0.5
+SAMPLE_SEC = 0.01
+
+
+def peak_rss_bytes() -> int:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # linux reports kilobytes, macos bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def configure_environment(url: str, cache_dir: str, backend: str) -> None:
+    os.environ.update(
+        {
+            "GITLAB_HOST": url,
+            "GITLAB_TOKEN": "benchmark",
+            "PIPELINE_MANAGER_PROJECTS": PROJECT_PATH,
+            "PIPELINE_MANAGER_BACKEND": backend,
+            "PIPELINE_MANAGER_CACHE_DIR": cache_dir,
+            # never attach to a collector someone left running
+            "PIPELINE_MANAGER_SOCKET": os.path.join(cache_dir, "no-collector.sock"),
+        }
+    )
+
+
+async def wait_until(condition: Callable[[], bool], timeout: float) -> float:
+    deadline = time.perf_counter() + timeout
+    while not condition():
+        if time.perf_counter() > deadline:
+            raise TimeoutError("the dashboard did not get there in time")
+
+        await asyncio.sleep(SAMPLE_SEC)
+
+    return time.perf_counter()
+
+
+async def run_dashboard(args: argparse.Namespace) -> dict[str, Any]:
+    configure_environment(args.url, args.cache_dir, args.backend)
+
+    # Config and the caches read the environment on import
+    from src.pipeline_manager.cli import PipelineManager
+    from src.pipeline_manager.components.pipeline_list_item import (
+        PipelineListItem,
+    )
+    from src.pipeline_manager.gitlab_api import engine
+    from src.pipeline_manager.metrics import metrics
+
+    app = PipelineManager()
+    app.REQUEST_INTERVAL_SEC = args.interval
+    app.MAX_REQUEST_INTERVAL_SEC = args.interval
+
+    peak_threads = threading.active_count()
+    idle_since: float | None = None
+
+    def rows() -> list[PipelineListItem]:
+        return list(app.query(PipelineListItem))
+
+    def painted() -> bool:
+        return len(rows()) > 0
+
+    def loaded() -> bool:
+        nonlocal idle_since, peak_threads
+        peak_threads = max(peak_threads, threading.active_count())
+
+        materialized = [row for row in rows() if row.materialized]
+        busy = engine.scheduler.active > 0 or engine.scheduler.queue_depth > 0
+        if busy or len(materialized) == 0 or not all(r.loaded for r in materialized):
+            idle_since = None
+            return False
+
+        now = time.perf_counter()
+        if idle_since is None:
+            idle_since = now
+
+        return now - idle_since >= SETTLE_SEC
+
+    async with aiohttp.ClientSession(args.url) as control:
+        started = time.perf_counter()
+
+        async with app.run_test(size=(args.width, args.height)):
+            first_paint = await wait_until(painted, args.timeout)
+            await wait_until(loaded, args.timeout)
+            assert idle_since is not None
+            fully_loaded = idle_since
+
+            async with control.get("/_stats") as response:
+                load_requests = (await response.json())["total"]
+            deduplicated = sum(metrics.deduplicated.values())
+
+            await control.post("/_reset")
+            for _ in range(args.cycles):
+                await control.post("/_tick")
+                cycle_end = time.perf_counter() + args.interval
+                while time.perf_counter() < cycle_end:
+                    peak_threads = max(peak_threads, threading.active_count())
+                    await asyncio.sleep(SAMPLE_SEC)
+
+            async with control.get("/_stats") as response:
+                stats = await response.json()
+
+            # nothing changes from here on, polling should back off
+            app.MAX_REQUEST_INTERVAL_SEC = app.__class__.MAX_REQUEST_INTERVAL_SEC
+            await control.post("/_reset")
+            await asyncio.sleep(args.idle_sec)
+
+            async with control.get("/_stats") as response:
+                idle_polls = (await response.json())["list_polls"]
+
+            materialized = sum(1 for row in rows() if row.materialized)
+
+    return {
+        "time_to_first_paint_sec": round(first_paint - started, 4),
+        "time_to_fully_loaded_sec": round(fully_loaded - started, 4),
+        "materialized_rows": materialized,
+        "requests_to_fully_loaded": load_requests,
+        "deduplicated_while_loading": deduplicated,
+        "refresh_cycles": stats["list_polls"],
+        "requests_per_refresh_cycle": round(
+            stats["total"] / max(stats["list_polls"], 1), 2
+        ),
+        "requests_during_refresh": stats["requests"],
+        "list_polls_while_idle": idle_polls,
+        "peak_threads": peak_threads,
+        "peak_rss_bytes": peak_rss_bytes(),
+    }
+
+
+def start_fake_gitlab(argv: list[str]) -> tuple[subprocess.Popen[str], str]:
+    server = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.fake_gitlab", *argv],
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    assert server.stdout is not None
+    url = server.stdout.readline().strip()
+    if url == "":
+        server.kill()
+        raise SystemExit("The fake GitLab did not start")
+
+    return server, url
+
+
+def scenario_argv(args: argparse.Namespace) -> list[str]:
+    argv = []
+    for key, value in vars(scenario_from_arguments(args)).items():
+        argv += [f"--{key.replace('_', '-')}", str(value)]
+
+    return argv
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Time the dashboard against a stand-in GitLab"
+    )
+    add_scenario_arguments(parser)
+    parser.add_argument("--backend", choices=["rest", "graphql"], default="rest")
+    parser.add_argument(
+        "--runs",
+        default="cold,warm",
+        help="comma separated, cold starts with an empty disk cache",
+    )
+    parser.add_argument("--interval", type=float, default=1.0)
+    parser.add_argument("--cycles", type=int, default=5)
+    parser.add_argument(
+        "--idle-sec",
+        type=float,
+        default=10,
+        help="how long to watch polling back off once nothing changes",
+    )
+    parser.add_argument("--width", type=int, default=160)
+    parser.add_argument("--height", type=int, default=50)
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--output", help="write the results here instead of stdout")
+    # every run gets a fresh interpreter so imports and rss start from zero
+    parser.add_argument("--url", help=argparse.SUPPRESS)
+    parser.add_argument("--cache-dir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.url is not None:
+        print(json.dumps(asyncio.run(run_dashboard(args))))
+        return
+
+    server, url = start_fake_gitlab(scenario_argv(args))
+    results = []
+    try:
+        with tempfile.TemporaryDirectory() as cache_dir:
+            for run in args.runs.split(","):
+                if run == "cold":
+                    shutil.rmtree(cache_dir)
+                    os.makedirs(cache_dir)
+
+                child = subprocess.run(
+                    [
+                        sys.executable,
+                        "-m",
+                        "benchmarks.e2e",
+                        *sys.argv[1:],
+                        "--url",
+                        url,
+                        "--cache-dir",
+                        cache_dir,
+                    ],
+                    stdout=subprocess.PIPE,
+                    text=True,
+                    check=True,
+                )
+                results.append({"run": run, **json.loads(child.stdout)})
+    finally:
+        server.terminate()
+        server.wait()
+
+    report = json.dumps(
+        {
+            "scenario": vars(scenario_from_arguments(args)),
+            "backend": args.backend,
+            "interval_sec": args.interval,
+            "results": results,
+        },
+        indent=2,
+    )
+    if args.output is None:
+        print(report)
+    else:
+        with open(args.output, "w") as file:
+            file.write(report + "\n")
+
+
+if __name__ == "__main__":
+    main()
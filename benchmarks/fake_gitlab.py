@@ -0,0 +1,466 @@
+import argparse
+import asyncio
+import hashlib
+import io
+import json
+import random
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any
+
+from aiohttp import web
+
+PROJECT_ID = 1
+PROJECT_PATH = "bench/project"
+STAGES = ["build", "test", "lint", "deploy"]
+
+
+@dataclass
+class Scenario:
+    pipelines: int = 100
+    running: int = 2
+    jobs_per_pipeline: int = 12
+    commits: int = 50
+    users: int = 8
+    avatar_size: int = 64
+    latency_ms: float = 0
+    jitter_ms: float = 0
+
+
+def iso(timestamp: float) -> str:
+    return time.strftime("%Y-%m-%dT%H:%M:%S.000Z", time.gmtime(timestamp))
+
+
+class FakeGitLab:
+    def __init__(self, scenario: Scenario) -> None:
+        self.scenario = scenario
+        self.base_url = ""
+        self.requests: Counter[str] = Counter()
+        self.list_polls = 0
+        self.pipelines: list[dict[str, Any]] = []
+        self.avatars: dict[str, bytes] = {}
+
+        now = time.time()
+        for index in range(scenario.pipelines):
+            status = (
+                "running"
+                if index >= scenario.pipelines - scenario.running
+                else "success"
+            )
+            if status == "success" and index % 7 == 0:
+                status = "failed"
+
+            self.pipelines.append(
+                self.make_pipeline(
+                    index + 1, status, now - (scenario.pipelines - index) * 60
+                )
+            )
+
+        self.pipelines.reverse()
+
+    def sha(self, index: int) -> str:
+        return hashlib.sha1(str(index % self.scenario.commits).encode()).hexdigest()
+
+    def username(self, sha: str) -> str:
+        return f"user{int(sha[:8], 16) % self.scenario.users}"
+
+    def make_pipeline(
+        self, pipeline_id: int, status: str, created: float
+    ) -> dict[str, Any]:
+        return {
+            "id": pipeline_id,
+            "iid": pipeline_id,
+            "project_id": PROJECT_ID,
+            "sha": self.sha(pipeline_id),
+            "ref": ["main", "develop", "feature/a"][pipeline_id % 3],
+            "status": status,
+            "source": "push",
+            "created_at": iso(created),
+            "updated_at": iso(created + 30),
+            "web_url": f"{self.base_url}/{PROJECT_PATH}/-/pipelines/{pipeline_id}",
+            "name": None,
+        }
+
+    def advance(self) -> None:
+        # finish the newest running pipeline and start another one
+        now = time.time()
+        for pipeline in self.pipelines:
+            if pipeline["status"] == "running":
+                pipeline["status"] = "success"
+                pipeline["updated_at"] = iso(now)
+                break
+
+        newest = self.pipelines[0]["id"] + 1
+        self.pipelines.insert(0, self.make_pipeline(newest, "running", now))
+
+    def touch(self) -> None:
+        # bump updated_at everywhere, statuses and jobs stay as they are
+        now = iso(time.time())
+        for pipeline in self.pipelines:
+            pipeline["updated_at"] = now
+
+    def jobs(self, pipeline: dict[str, Any]) -> list[dict[str, Any]]:
+        count = self.scenario.jobs_per_pipeline
+        jobs = []
+        for index in range(count):
+            stage = STAGES[index * len(STAGES) // count]
+            status = pipeline["status"]
+            if status == "running":
+                status = (
+                    "success"
+                    if index < count // 2
+                    else "running" if index == count // 2 else "created"
+                )
+
+            jobs.append(
+                {
+                    "id": pipeline["id"] * 1000 + index,
+                    "status": status,
+                    "stage": stage,
+                    "name": f"{stage}-{index}",
+                    "ref": pipeline["ref"],
+                    "tag": False,
+                    "coverage": None,
+                    "allow_failure": False,
+                    "created_at": pipeline["created_at"],
+                    "started_at": pipeline["created_at"],
+                    "finished_at": pipeline["updated_at"],
+                    "erased_at": None,
+                    "duration": 30.0,
+                    "queued_duration": 1.0,
+                    "user": {"id": 1, "username": "bench"},
+                    "commit": {"id": pipeline["sha"]},
+                    "pipeline": {"id": pipeline["id"]},
+                    "runner": None,
+                    "artifacts": [],
+                    "web_url": f"{pipeline['web_url']}/jobs/{index}",
+                }
+            )
+
+        return jobs[::-1]
+
+    def commit(self, sha: str) -> dict[str, Any]:
+        pipeline = next(
+            (p for p in self.pipelines if p["sha"] == sha), self.pipelines[0]
+        )
+        author = self.username(sha)
+        return {
+            "id": sha,
+            "short_id": sha[:8],
+            "created_at": pipeline["created_at"],
+            "parent_ids": [],
+            "title": f"Change {sha[:6]}",
+            "message": f"Change {sha[:6]}\n",
+            "author_name": author,
+            "author_email": f"{author}@example.com",
+            "authored_date": pipeline["created_at"],
+            "committer_name": author,
+            "committer_email": f"{author}@example.com",
+            "committed_date": pipeline["created_at"],
+            "trailers": {},
+            "extended_trailers": {},
+            "web_url": f"{self.base_url}/{PROJECT_PATH}/-/commit/{sha}",
+            "stats": {"additions": 3, "deletions": 1, "total": 4},
+            "status": pipeline["status"],
+            "project_id": PROJECT_ID,
+            "last_pipeline": {
+                key: value for key, value in pipeline.items() if key != "name"
+            },
+        }
+
+    def avatar(self, name: str) -> bytes:
+        if name not in self.avatars:
+            from PIL import Image
+
+            seed = int(hashlib.sha1(name.encode()).hexdigest()[:6], 16)
+            color = (seed >> 16 & 255, seed >> 8 & 255, seed & 255)
+            image = Image.new("RGB", (self.scenario.avatar_size,) * 2, color)
+            buffer = io.BytesIO()
+            image.save(buffer, "PNG")
+            self.avatars[name] = buffer.getvalue()
+
+        return self.avatars[name]
+
+    @web.middleware
+    async def middleware(
+        self, request: web.Request, handler: Any
+    ) -> web.StreamResponse:
+        if request.path.startswith("/_"):
+            return await handler(request)
+
+        route = request.match_info.route.resource
+        self.requests[route.canonical if route is not None else request.path] += 1
+
+        delay = self.scenario.latency_ms + random.uniform(0, self.scenario.jitter_ms)
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+
+        return await handler(request)
+
+    def paginate(
+        self, request: web.Request, items: list[Any], default: int = 20
+    ) -> web.Response:
+        per_page = int(request.query.get("per_page", default))
+        page = int(request.query.get("page", 1))
+        body = json.dumps(items[(page - 1) * per_page : page * per_page])
+
+        etag = 'W/"' + hashlib.md5(body.encode()).hexdigest() + '"'
+        if request.headers.get("If-None-Match") == etag:
+            return web.Response(status=304, headers={"ETag": etag})
+
+        headers = {"ETag": etag, "X-Page": str(page), "X-Per-Page": str(per_page)}
+        if page * per_page < len(items):
+            headers["X-Next-Page"] = str(page + 1)
+
+        return web.Response(text=body, content_type="application/json", headers=headers)
+
+    def find_pipeline(self, request: web.Request) -> dict[str, Any]:
+        pipeline_id = int(request.match_info["pipeline"])
+        return next(p for p in self.pipelines if p["id"] == pipeline_id)
+
+    async def user(self, request: web.Request) -> web.Response:
+        return web.json_response({"id": 1, "username": "bench"})
+
+    async def project(self, request: web.Request) -> web.Response:
+        return web.json_response(
+            {"id": PROJECT_ID, "path_with_namespace": PROJECT_PATH}
+        )
+
+    async def list_pipelines(self, request: web.Request) -> web.Response:
+        updated_after = request.query.get("updated_after")
+        if request.query.get("page", "1") == "1":
+            self.list_polls += 1
+
+        # inclusive like gitlab's, the newest pipeline comes back every poll
+        pipelines = [
+            p
+            for p in self.pipelines
+            if updated_after is None or p["updated_at"] >= updated_after
+        ]
+        return self.paginate(request, pipelines)
+
+    async def pipeline(self, request: web.Request) -> web.Response:
+        return web.json_response(self.find_pipeline(request))
+
+    async def pipeline_jobs(self, request: web.Request) -> web.Response:
+        return self.paginate(request, self.jobs(self.find_pipeline(request)))
+
+    async def pipeline_bridges(self, request: web.Request) -> web.Response:
+        return self.paginate(request, [])
+
+    async def repository_commit(self, request: web.Request) -> web.Response:
+        return web.json_response(self.commit(request.match_info["sha"]))
+
+    async def users(self, request: web.Request) -> web.Response:
+        username = request.query.get("username", "")
+        return web.json_response(
+            [
+                {
+                    "id": 10,
+                    "username": username,
+                    "name": username,
+                    "avatar_url": f"{self.base_url}/avatars/{username}.png",
+                }
+            ]
+        )
+
+    async def avatar_image(self, request: web.Request) -> web.Response:
+        return web.Response(
+            body=self.avatar(request.match_info["name"]), content_type="image/png"
+        )
+
+    async def graphql(self, request: web.Request) -> web.Response:
+        self.list_polls += 1
+        variables = (await request.json())["variables"]
+        updated_after = variables.get("updatedAfter")
+        pipelines = [
+            p
+            for p in self.pipelines
+            if updated_after is None or p["updated_at"] >= updated_after
+        ]
+
+        start = int(variables.get("after") or 0)
+        if start > 0:
+            self.list_polls -= 1
+
+        first = variables["first"]
+        connection = {
+            "pageInfo": {
+                "hasNextPage": start + first < len(pipelines),
+                "endCursor": str(start + first),
+            },
+            "nodes": [self.graphql_node(p) for p in pipelines[start : start + first]],
+        }
+
+        if "fullPaths" in variables:
+            nodes = [{"fullPath": PROJECT_PATH, "pipelines": connection}]
+            return web.json_response({"data": {"projects": {"nodes": nodes}}})
+
+        return web.json_response({"data": {"project": {"pipelines": connection}}})
+
+    def graphql_node(self, pipeline: dict[str, Any]) -> dict[str, Any]:
+        commit = self.commit(pipeline["sha"])
+        return {
+            "id": f"gid://gitlab/Ci::Pipeline/{pipeline['id']}",
+            "iid": str(pipeline["iid"]),
+            "sha": pipeline["sha"],
+            "ref": pipeline["ref"],
+            "status": pipeline["status"].upper(),
+            "source": pipeline["source"].upper(),
+            "name": None,
+            "createdAt": pipeline["created_at"],
+            "updatedAt": pipeline["updated_at"],
+            "path": f"/{PROJECT_PATH}/-/pipelines/{pipeline['id']}",
+            "commit": {
+                "sha": commit["id"],
+                "shortId": commit["short_id"],
+                "title": commit["title"],
+                "message": commit["message"],
+                "authorName": commit["author_name"],
+                "authorEmail": commit["author_email"],
+                "authoredDate": commit["authored_date"],
+                "committerName": commit["committer_name"],
+                "committerEmail": commit["committer_email"],
+                "committedDate": commit["committed_date"],
+                "webUrl": commit["web_url"],
+                "author": {
+                    "username": commit["author_name"],
+                    "avatarUrl": f"/avatars/{commit['author_name']}.png",
+                },
+            },
+            "jobs": {
+                "pageInfo": {"hasNextPage": False},
+                "nodes": [
+                    {
+                        "id": f"gid://gitlab/Ci::Build/{job['id']}",
+                        "name": job["name"],
+                        "status": job["status"].upper(),
+                        "stage": {"name": job["stage"]},
+                        "refName": job["ref"],
+                        "allowFailure": job["allow_failure"],
+                        "coverage": job["coverage"],
+                        "createdAt": job["created_at"],
+                        "startedAt": job["started_at"],
+                        "finishedAt": job["finished_at"],
+                        "duration": job["duration"],
+                        "queuedDuration": job["queued_duration"],
+                        "retried": False,
+                    }
+                    for job in self.jobs(pipeline)
+                ],
+            },
+        }
+
+    async def stats(self, request: web.Request) -> web.Response:
+        return web.json_response(
+            {
+                "requests": dict(self.requests),
+                "total": sum(self.requests.values()),
+                "list_polls": self.list_polls,
+            }
+        )
+
+    async def reset(self, request: web.Request) -> web.Response:
+        self.requests.clear()
+        self.list_polls = 0
+        return web.json_response({})
+
+    async def tick(self, request: web.Request) -> web.Response:
+        self.advance()
+        return web.json_response({"newest": self.pipelines[0]["id"]})
+
+    async def touch_all(self, request: web.Request) -> web.Response:
+        self.touch()
+        return web.json_response({})
+
+    def build_app(self) -> web.Application:
+        app = web.Application(middlewares=[self.middleware])
+        api = "/api/v4"
+        project = f"{api}/projects/{{project}}"
+
+        app.router.add_get(f"{api}/user", self.user)
+        app.router.add_get(project, self.project)
+        app.router.add_get(f"{project}/pipelines", self.list_pipelines)
+        app.router.add_get(f"{project}/pipelines/{{pipeline}}", self.pipeline)
+        app.router.add_get(f"{project}/pipelines/{{pipeline}}/jobs", self.pipeline_jobs)
+        app.router.add_get(
+            f"{project}/pipelines/{{pipeline}}/bridges", self.pipeline_bridges
+        )
+        app.router.add_get(
+            f"{project}/repository/commits/{{sha}}", self.repository_commit
+        )
+        app.router.add_get(f"{api}/users", self.users)
+        app.router.add_get("/avatars/{name}", self.avatar_image)
+        app.router.add_post("/api/graphql", self.graphql)
+        app.router.add_get("/_stats", self.stats)
+        app.router.add_post("/_reset", self.reset)
+        app.router.add_post("/_tick", self.tick)
+        app.router.add_post("/_touch", self.touch_all)
+
+        return app
+
+
+def add_scenario_arguments(parser: argparse.ArgumentParser) -> None:
+    defaults = Scenario()
+    parser.add_argument("--pipelines", type=int, default=defaults.pipelines)
+    parser.add_argument("--running", type=int, default=defaults.running)
+    parser.add_argument(
+        "--jobs-per-pipeline", type=int, default=defaults.jobs_per_pipeline
+    )
+    parser.add_argument("--commits", type=int, default=defaults.commits)
+    parser.add_argument("--users", type=int, default=defaults.users)
+    parser.add_argument("--avatar-size", type=int, default=defaults.avatar_size)
+    parser.add_argument("--latency-ms", type=float, default=defaults.latency_ms)
+    parser.add_argument("--jitter-ms", type=float, default=defaults.jitter_ms)
+
+
+def scenario_from_arguments(args: argparse.Namespace) -> Scenario:
+    return Scenario(
+        pipelines=args.pipelines,
+        running=args.running,
+        jobs_per_pipeline=args.jobs_per_pipeline,
+        commits=args.commits,
+        users=args.users,
+        avatar_size=args.avatar_size,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+    )
+
+
+async def serve(scenario: Scenario, host: str, port: int) -> None:
+    fake = FakeGitLab(scenario)
+    runner = web.AppRunner(fake.build_app(), access_log=None)
+    await runner.setup()
+
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+
+    bound_port = runner.addresses[0][1]
+    fake.base_url = f"http://{host}:{bound_port}"
+    for pipeline in fake.pipelines:
+        pipeline["web_url"] = (
+            f"{fake.base_url}/{PROJECT_PATH}/-/pipelines/{pipeline['id']}"
+        )
+
+    # the harness reads this line to find out where we ended up
+    print(fake.base_url, flush=True)
+
+    await asyncio.Event().wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="A stand-in GitLab for benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=0)
+    add_scenario_arguments(parser)
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(serve(scenario_from_arguments(args), args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+import gc
+import json
+import os
+import tempfile
+import tracemalloc
+from typing import Any, Callable
+
+from src.pipeline_manager.job_table import JobTable
+from src.pipeline_manager.mappers import (
+    raw_commit_to_commit,
+    raw_jobs_to_jobs,
+    raw_pipeline_to_pipeline,
+)
+
+PIPELINES = 1000
+JOBS_PER_PIPELINE = 20
+STAGES = ["build", "test", "lint", "package", "deploy"]
+REFS = ["main", "develop", "feature/login", "feature/search", "release/1.2"]
+STATUSES = ["success", "failed", "running", "pending", "skipped"]
+AUTHORS = ["Ada Lovelace", "Alan Turing", "Grace Hopper", "Ken Thompson"]
+
+
+def fresh(value: str) -> str:
+    # json round trips hand out a new string object per field, like a real response
+    return "".join(list(value))
+
+
+def make_pipeline(pipeline_id: int) -> dict[str, Any]:
+    sha = f"{pipeline_id:040x}"
+    return {
+        "id": pipeline_id,
+        "iid": pipeline_id,
+        "project_id": 1,
+        "sha": sha,
+        "ref": fresh(REFS[pipeline_id % len(REFS)]),
+        "status": fresh(STATUSES[pipeline_id % len(STATUSES)]),
+        "source": fresh("push"),
+        "created_at": "2025-02-01T10:00:00.000+00:00",
+        "updated_at": "2025-02-01T10:05:00.000+00:00",
+        "web_url": f"https://gitlab.example.com/group/project/-/pipelines/{pipeline_id}",
+    }
+
+
+def make_commit(pipeline: dict[str, Any]) -> dict[str, Any]:
+    author = AUTHORS[pipeline["id"] % len(AUTHORS)]
+    return {
+        "id": pipeline["sha"],
+        "short_id": pipeline["sha"][:8],
+        "created_at": "2025-02-01T09:59:00.000+00:00",
+        "parent_ids": [f"{pipeline['id'] - 1:040x}"],
+        "title": f"Change number {pipeline['id']}",
+        "message": f"Change number {pipeline['id']}\n",
+        "author_name": fresh(author),
+        "author_email": fresh(f"{author.split()[0].lower()}@example.com"),
+        "authored_date": "2025-02-01T09:59:00.000+00:00",
+        "committer_name": fresh(author),
+        "committer_email": fresh(f"{author.split()[0].lower()}@example.com"),
+        "committed_date": "2025-02-01T09:59:00.000+00:00",
+        "trailers": {},
+        "extended_trailers": {},
+        "web_url": f"https://gitlab.example.com/group/project/-/commit/{pipeline['sha']}",
+        "stats": {"additions": 10, "deletions": 2, "total": 12},
+        "status": fresh(pipeline["status"]),
+        "project_id": 1,
+        "last_pipeline": dict(pipeline),
+    }
+
+
+def make_jobs(pipeline: dict[str, Any]) -> list[dict[str, Any]]:
+    jobs = []
+    for index in range(JOBS_PER_PIPELINE):
+        stage = STAGES[index * len(STAGES) // JOBS_PER_PIPELINE]
+        jobs.append(
+            {
+                "id": pipeline["id"] * 100 + index,
+                "status": fresh(STATUSES[index % len(STATUSES)]),
+                "stage": fresh(stage),
+                "name": fresh(f"{stage}-{index}"),
+                "ref": fresh(pipeline["ref"]),
+                "tag": False,
+                "coverage": None,
+                "allow_failure": False,
+                "created_at": "2025-02-01T10:00:00.000+00:00",
+                "started_at": "2025-02-01T10:00:10.000+00:00",
+                "finished_at": "2025-02-01T10:01:10.000+00:00",
+                "erased_at": None,
+                "duration": 60.0,
+                "queued_duration": 1.5,
+            }
+        )
+    return jobs
+
+
+def payload(value: Any) -> Any:
+    # what a response hands the app, everything in it is a fresh object
+    return json.loads(json.dumps(value))
+
+
+def measure(build: Callable[[], Any]) -> tuple[Any, int]:
+    gc.collect()
+    tracemalloc.start()
+    value = build()
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return value, size
+
+
+def main() -> None:
+    def build_raw() -> dict[str, Any]:
+        pipelines = [make_pipeline(1000 + index) for index in range(PIPELINES)]
+        return {
+            "pipelines": pipelines,
+            "commits": [make_commit(p) for p in pipelines],
+            "jobs": {p["id"]: make_jobs(p) for p in pipelines},
+        }
+
+    raw, raw_bytes = measure(build_raw)
+
+    def build_mapped() -> dict[str, Any]:
+        return {
+            "pipelines": raw_pipeline_to_pipeline(raw["pipelines"]),
+            "commits": [raw_commit_to_commit(c) for c in raw["commits"]],
+            "jobs": {
+                pipeline_id: raw_jobs_to_jobs(jobs)
+                for pipeline_id, jobs in raw["jobs"].items()
+            },
+        }
+
+    mapped, mapped_bytes = measure(build_mapped)
+    table, table_bytes = measure(lambda: JobTable.from_pipelines(mapped["jobs"]))
+
+    # the caches persist, keep them out of the user's cache dir
+    os.environ["PIPELINE_MANAGER_CACHE_DIR"] = tempfile.mkdtemp()
+    from src.pipeline_manager.data import parse_timestamp
+    from src.pipeline_manager.gitlab_api import (
+        PipelinePoller,
+        get_cached_commit,
+        slim_job,
+        store_commit,
+        store_pipeline_jobs,
+    )
+
+    def build_resident() -> dict[str, Any]:
+        # what a session actually keeps: the poller's pipelines, the commit and
+        # job caches, and the models mapped from them
+        poller = PipelinePoller(1, depth=PIPELINES, days=None)
+        poller.raw_pipelines = {}
+        poller.apply(
+            [payload(make_pipeline(1000 + index)) for index in range(PIPELINES)],
+            full_sync=True,
+        )
+
+        jobs = {}
+        for p in poller.get_pipelines():
+            store_commit(payload(make_commit(p)))
+
+            raw_jobs = [slim_job(job) for job in payload(make_jobs(p))]
+            store_pipeline_jobs(
+                p["id"], raw_jobs, parse_timestamp(p["updated_at"]), p["status"]
+            )
+            jobs[p["id"]] = raw_jobs_to_jobs(raw_jobs)
+
+        pipelines = raw_pipeline_to_pipeline(poller.get_pipelines())
+        return {
+            "poller": poller,
+            "pipelines": pipelines,
+            "commits": [
+                raw_commit_to_commit(get_cached_commit(p.sha)) for p in pipelines
+            ],
+            "jobs": jobs,
+        }
+
+    _, resident_bytes = measure(build_resident)
+
+    per_thousand = 1000 / PIPELINES
+    print(
+        json.dumps(
+            {
+                "pipelines": PIPELINES,
+                "jobs_per_pipeline": JOBS_PER_PIPELINE,
+                "raw_bytes_per_1000_pipelines": int(raw_bytes * per_thousand),
+                "mapped_bytes_per_1000_pipelines": int(mapped_bytes * per_thousand),
+                "job_table_bytes_per_1000_pipelines": int(table_bytes * per_thousand),
+                "job_table_rows": len(table),
+                # the figure to quote, the two above leave out the caches
+                "resident_bytes_per_1000_pipelines": int(resident_bytes * per_thousand),
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
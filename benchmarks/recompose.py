@@ -0,0 +1,162 @@
+import argparse
+import asyncio
+import json
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from typing import Any
+
+import aiohttp
+
+from benchmarks.e2e import (
+    SAMPLE_SEC,
+    SETTLE_SEC,
+    configure_environment,
+    start_fake_gitlab,
+    wait_until,
+)
+
+# what each scenario does to the stand-in before the refresh cycles run
+SCENARIOS = {
+    "unchanged": None,
+    "touched": "/_touch",
+    "one_new": "/_tick",
+}
+
+
+async def list_polls(control: aiohttp.ClientSession) -> int:
+    async with control.get("/_stats") as response:
+        return (await response.json())["list_polls"]
+
+
+async def run_recompose(args: argparse.Namespace) -> dict[str, Any]:
+    configure_environment(args.url, args.cache_dir, args.backend)
+
+    from src.pipeline_manager.cli import PipelineManager
+    from src.pipeline_manager.components.pipeline_list_item import (
+        PipelineListItem,
+    )
+    from src.pipeline_manager.gitlab_api import engine
+    from src.pipeline_manager.metrics import metrics
+
+    app = PipelineManager()
+    app.REQUEST_INTERVAL_SEC = args.interval
+    app.MAX_REQUEST_INTERVAL_SEC = args.interval
+
+    idle_since: float | None = None
+
+    def rows() -> list[PipelineListItem]:
+        return list(app.query(PipelineListItem))
+
+    def loaded() -> bool:
+        nonlocal idle_since
+
+        # offscreen rows only load once scrolled to, load all of them up front
+        for row in rows():
+            row.materialize()
+
+        busy = engine.scheduler.active > 0 or engine.scheduler.queue_depth > 0
+        if busy or len(rows()) < args.pipelines or not all(r.loaded for r in rows()):
+            idle_since = None
+            return False
+
+        now = time.perf_counter()
+        if idle_since is None:
+            idle_since = now
+
+        return now - idle_since >= SETTLE_SEC
+
+    results = {}
+    async with aiohttp.ClientSession(args.url) as control:
+        async with app.run_test(size=(args.width, args.height)):
+            await wait_until(loaded, args.timeout)
+
+            for scenario, action in SCENARIOS.items():
+                composes = Counter(metrics.composes)
+                renders = Counter(metrics.renders)
+
+                for _ in range(args.cycles):
+                    await control.post("/_reset")
+                    if action is not None:
+                        await control.post(action)
+
+                    # one list poll picks the change up, then wait for the rows
+                    while await list_polls(control) == 0:
+                        await asyncio.sleep(SAMPLE_SEC)
+
+                    idle_since = None
+                    await wait_until(loaded, args.timeout)
+
+                composed = Counter(metrics.composes) - composes
+                rendered = Counter(metrics.renders) - renders
+                results[scenario] = {
+                    "composes_per_refresh": round(
+                        sum(composed.values()) / args.cycles, 2
+                    ),
+                    "renders_per_refresh": round(
+                        sum(rendered.values()) / args.cycles, 2
+                    ),
+                    "composes": dict(composed),
+                    "renders": dict(rendered),
+                }
+
+            rows_loaded = len(rows())
+
+    return {"rows": rows_loaded, "backend": args.backend, **results}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Count widget composes per refresh cycle for a fully loaded list"
+    )
+    parser.add_argument("--backend", choices=["rest", "graphql"], default="rest")
+    parser.add_argument("--pipelines", type=int, default=100)
+    parser.add_argument("--cycles", type=int, default=3)
+    parser.add_argument("--interval", type=float, default=1.0)
+    parser.add_argument("--width", type=int, default=160)
+    parser.add_argument("--height", type=int, default=50)
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--output", help="write the results here instead of stdout")
+    parser.add_argument("--url", help=argparse.SUPPRESS)
+    parser.add_argument("--cache-dir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.url is not None:
+        print(json.dumps(asyncio.run(run_recompose(args))))
+        return
+
+    server, url = start_fake_gitlab(["--pipelines", str(args.pipelines)])
+    try:
+        with tempfile.TemporaryDirectory() as cache_dir:
+            # a fresh interpreter so the metrics only hold this run
+            child = subprocess.run(
+                [
+                    sys.executable,
+                    "-m",
+                    "benchmarks.recompose",
+                    *sys.argv[1:],
+                    "--url",
+                    url,
+                    "--cache-dir",
+                    cache_dir,
+                ],
+                stdout=subprocess.PIPE,
+                text=True,
+                check=True,
+            )
+    finally:
+        server.terminate()
+        server.wait()
+
+    report = json.dumps(json.loads(child.stdout), indent=2)
+    if args.output is None:
+        print(report)
+    else:
+        with open(args.output, "w") as file:
+            file.write(report + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any
+
+from benchmarks.e2e import configure_environment, start_fake_gitlab, wait_until
+
+HEAVY_MODULES = ["numpy", "PIL", "gitlab", "requests", "arrow"]
+
+
+def loaded_heavy_modules() -> list[str]:
+    return [module for module in HEAVY_MODULES if module in sys.modules]
+
+
+async def run_startup(args: argparse.Namespace) -> dict[str, Any]:
+    configure_environment(args.url, args.cache_dir, "rest")
+
+    started = time.perf_counter()
+    from src.pipeline_manager.cli import PipelineManager
+    from src.pipeline_manager.components.pipeline_list_item import (
+        PipelineListItem,
+    )
+    from src.pipeline_manager.metrics import metrics
+
+    imported = time.perf_counter()
+    heavy_after_import = loaded_heavy_modules()
+
+    app = PipelineManager()
+    async with app.run_test(size=(args.width, args.height)):
+        first_frame = time.perf_counter()
+        first_rows = await wait_until(
+            lambda: len(app.query(PipelineListItem)) > 0, args.timeout
+        )
+        heavy_at_first_rows = loaded_heavy_modules()
+        resolved_remotely = "login" in metrics.calls
+
+    return {
+        "import_sec": round(imported - started, 4),
+        "time_to_first_frame_sec": round(first_frame - started, 4),
+        "time_to_first_rows_sec": round(first_rows - started, 4),
+        "heavy_modules_after_import": heavy_after_import,
+        "heavy_modules_at_first_rows": heavy_at_first_rows,
+        "projects_resolved_via_api": resolved_remotely,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Time imports and the first frame of the dashboard"
+    )
+    parser.add_argument("--runs", default="cold,warm,warm")
+    parser.add_argument("--pipelines", type=int, default=100)
+    parser.add_argument("--width", type=int, default=160)
+    parser.add_argument("--height", type=int, default=50)
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--output", help="write the results here instead of stdout")
+    parser.add_argument("--url", help=argparse.SUPPRESS)
+    parser.add_argument("--cache-dir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.url is not None:
+        print(json.dumps(asyncio.run(run_startup(args))))
+        return
+
+    server, url = start_fake_gitlab(["--pipelines", str(args.pipelines)])
+    results = []
+    try:
+        with tempfile.TemporaryDirectory() as cache_dir:
+            for run in args.runs.split(","):
+                if run == "cold":
+                    shutil.rmtree(cache_dir)
+                    os.makedirs(cache_dir)
+
+                child = subprocess.run(
+                    [
+                        sys.executable,
+                        "-m",
+                        "benchmarks.startup",
+                        *sys.argv[1:],
+                        "--url",
+                        url,
+                        "--cache-dir",
+                        cache_dir,
+                    ],
+                    stdout=subprocess.PIPE,
+                    text=True,
+                    check=True,
+                )
+                results.append({"run": run, **json.loads(child.stdout)})
+    finally:
+        server.terminate()
+        server.wait()
+
+    report = json.dumps({"results": results}, indent=2)
+    if args.output is None:
+        print(report)
+    else:
+        with open(args.output, "w") as file:
+            file.write(report + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,30 @@
+import argparse
+import asyncio
+import logging
+
 from .cli import PipelineManager
+from .collector import run_collector
 
 
 def main() -> None:
+    parser = argparse.ArgumentParser(prog="pipeline-manager")
+    parser.add_argument(
+        "command",
+        nargs="?",
+        choices=["ui", "collector"],
+        default="ui",
+        help="collector polls in the background and serves every ui started after it",
+    )
+    args = parser.parse_args()
+
+    if args.command == "collector":
+        logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+        try:
+            asyncio.run(run_collector())
+        except KeyboardInterrupt:
+            pass
+        return
+
     app = PipelineManager()
     app.run()
 
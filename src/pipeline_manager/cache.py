@@ -0,0 +1,216 @@
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any
+
+import msgpack
+from platformdirs import user_cache_dir
+
+CACHE_DIR = os.environ.get(
+    "PIPELINE_MANAGER_CACHE_DIR", user_cache_dir("pipeline-manager")
+)
+
+_DEFAULT_TTL: Any = object()
+
+MB = 1024 * 1024
+DAY_SEC = 24 * 60 * 60
+# a namespace is pruned on its first write of a session and every this many after
+PRUNE_EVERY_WRITES = 256
+
+
+@dataclass
+class CacheEntry:
+    value: Any
+    fetched_at: float
+    meta: dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.fetched_at
+
+
+@dataclass(frozen=True)
+class DiskLimit:
+    max_bytes: int
+    # entries nobody read or wrote for this long go, whatever the size
+    max_idle_sec: float | None = None
+
+
+DISK_LIMITS = {
+    "commits": DiskLimit(64 * MB, 90 * DAY_SEC),
+    "jobs": DiskLimit(128 * MB, 30 * DAY_SEC),
+    "users": DiskLimit(4 * MB, 30 * DAY_SEC),
+    "avatars": DiskLimit(64 * MB, 30 * DAY_SEC),
+    "pipelines": DiskLimit(32 * MB, 30 * DAY_SEC),
+    "projects": DiskLimit(1 * MB, 30 * DAY_SEC),
+    "remotes": DiskLimit(1 * MB, 30 * DAY_SEC),
+}
+
+
+class DiskCache:
+    def __init__(self, root: str, limits: dict[str, DiskLimit] | None = None) -> None:
+        self.root = root
+        self.limits = limits or {}
+        self.pruned = 0
+
+        self._writes: dict[str, int] = {}
+        self._pruning: set[str] = set()
+        self._lock = threading.Lock()
+
+    def _path(self, namespace: str, key: str) -> str:
+        digest = hashlib.sha1(key.encode()).hexdigest()
+        return os.path.join(self.root, namespace, digest[:2], f"{digest}.msgpack")
+
+    def get(self, namespace: str, key: str) -> CacheEntry | None:
+        try:
+            path = self._path(namespace, key)
+            with open(path, "rb") as f:
+                entry = msgpack.unpackb(f.read())
+
+            # the mtime is when it was last used, pruning goes by that
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+
+        return CacheEntry(entry["value"], entry["fetched_at"], entry["meta"])
+
+    def set(self, namespace: str, key: str, value: Any, **meta: Any) -> None:
+        path = self._path(namespace, key)
+        directory = os.path.dirname(path)
+
+        entry = {"value": value, "fetched_at": time.time(), "meta": meta}
+
+        try:
+            os.makedirs(directory, exist_ok=True)
+
+            # write-then-rename so concurrent readers never see half a file
+            fd, temp_path = tempfile.mkstemp(dir=directory)
+            with os.fdopen(fd, "wb") as f:
+                f.write(msgpack.packb(entry))
+
+            os.replace(temp_path, path)
+        except OSError:
+            pass
+
+        self._written(namespace)
+
+    def _written(self, namespace: str) -> None:
+        if namespace not in self.limits:
+            return
+
+        with self._lock:
+            writes = self._writes.get(namespace, 0)
+            self._writes[namespace] = writes + 1
+
+            if writes % PRUNE_EVERY_WRITES != 0 or namespace in self._pruning:
+                return
+
+            self._pruning.add(namespace)
+
+        # walking the directory can take a while, writes happen on the event loop
+        threading.Thread(
+            target=self._prune_in_background, args=(namespace,), daemon=True
+        ).start()
+
+    def _prune_in_background(self, namespace: str) -> None:
+        try:
+            self.prune(namespace)
+        finally:
+            with self._lock:
+                self._pruning.discard(namespace)
+
+    def prune(self, namespace: str) -> int:
+        limit = self.limits.get(namespace)
+        if limit is None:
+            return 0
+
+        files: list[tuple[float, int, str]] = []
+        for directory, _, names in os.walk(os.path.join(self.root, namespace)):
+            for name in names:
+                path = os.path.join(directory, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+
+                files.append((stat.st_mtime, stat.st_size, path))
+
+        # most recently used first, whatever does not fit after them goes
+        files.sort(reverse=True)
+        now = time.time()
+        kept_bytes = 0
+        removed = 0
+        for used_at, size, path in files:
+            idle = limit.max_idle_sec is not None and now - used_at > limit.max_idle_sec
+            if not idle and kept_bytes + size <= limit.max_bytes:
+                kept_bytes += size
+                continue
+
+            try:
+                os.remove(path)
+                removed += 1
+            except OSError:
+                pass
+
+        self.pruned += removed
+        return removed
+
+
+class MemoryCache:
+    def __init__(self, max_entries: int, ttl: float | None = None) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, tuple[float | None, Any]] = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Any | None:
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is not None and entry[0] is not None and entry[0] < time.time():
+                del self._entries[key]
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+
+            return entry[1]
+
+    def set(self, key: str, value: Any, ttl: float | None = _DEFAULT_TTL) -> None:
+        ttl = self.ttl if ttl is _DEFAULT_TTL else ttl
+        expires_at = time.time() + ttl if ttl is not None else None
+
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+disk_cache = DiskCache(CACHE_DIR, DISK_LIMITS)
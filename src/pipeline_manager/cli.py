@@ -1,48 +1,274 @@
+import asyncio
 import time
-from typing import List, TypeAlias
+from typing import Any
 
-from gitlab.base import RESTObject, RESTObjectList
 from textual import work
 from textual.app import App, ComposeResult
 from textual.reactive import reactive
 
+from .collector import CollectorClient, socket_path
+from .components.image.widget import canvas_cache
+from .components.metrics_overlay import MetricsOverlay
+from .components.pills import pill_cache_stats
 from .components.pipeline_list import PipelineList
-from .data import Pipeline
-from .gitlab_api import get_current_project, get_pipelines
+from .components.pipeline_list_item import PipelineListItem
+from .components.pipeline_timings import PipelineTimings
+from .data import Pipeline, parse_timestamp
+from .engine import FETCH_ERRORS
+from .gitlab_api import (
+    Config,
+    cache_stats,
+    engine,
+    get_cached_watched_projects,
+    get_pipelines,
+    get_watched_projects,
+    refresh_watched_projects,
+    store_pipeline_job,
+    store_pipeline_jobs,
+)
 from .mappers import raw_pipeline_to_pipeline
-
-Pipelines: TypeAlias = RESTObjectList | List[RESTObject]
+from .metrics import dump_metrics, hit_rates, metrics
+from .polling import Poller, build_poller
+from .webhooks import WebhookReceiver
 
 
 class PipelineManager(App):
     pipelines: reactive[list[Pipeline]] = reactive([])
-    worker_last_update = 0.0
     worker_running = True
     REQUEST_INTERVAL_SEC = 3
+    MAX_REQUEST_INTERVAL_SEC = 120
+    REQUEST_BACKOFF = 2
+    INCREMENTAL_POLLING = True
+    # with webhooks on, polling is only there to catch missed events
+    WEBHOOK_CHECK_INTERVAL_SEC = 60
+
+    # one clock for every relative timestamp on screen
+    CLOCK_INTERVAL_SEC = 1
+
+    BINDINGS = [("f12", "toggle_metrics", "Metrics")]
 
-    def on_unmount(self) -> None:
+    poller: Poller | None = None
+    webhooks: WebhookReceiver | None = None
+
+    async def on_unmount(self) -> None:
         self.worker_running = False
-        self.log.info("Dismounting, Closing thread...")
+        self.log.info("Dismounting, Closing connections...")
+        if self.webhooks is not None:
+            await self.webhooks.stop()
 
-    @work(exclusive=True, thread=True, name="Pipeline Updatetor")
-    def start_pipeline_updator(self) -> None:
-        self.log.info(f"Pipeline updator thread started")
-        project = get_current_project()
+        if Config.METRICS_FILE != "":
+            self.dump_metrics()
 
-        while self.worker_running:
-            elapsed = time.time() - self.worker_last_update
-            if elapsed < self.REQUEST_INTERVAL_SEC:
-                time.sleep(0.5)
-                continue
+        await engine.close()
+
+    def show_pipelines(self, pipelines: list[Pipeline]) -> None:
+        self.pipelines = pipelines
+        # workers can still deliver while the app tears the list down on exit
+        for pipeline_list in self.query(PipelineList):
+            pipeline_list.update_pipeline_list(self.pipelines)
+
+    async def update_pipelines(self, poller: Poller, project_ids: list[int]) -> bool:
+        if self.INCREMENTAL_POLLING:
+            if not await poller.poll():
+                return False
+
+            pipelines = raw_pipeline_to_pipeline(poller.get_pipelines())
+        else:
+            pages = await asyncio.gather(*(get_pipelines(id) for id in project_ids))
+            pipelines = raw_pipeline_to_pipeline(
+                sorted(
+                    (raw for page in pages for raw in page),
+                    key=lambda raw: raw["id"],
+                    reverse=True,
+                )
+            )
+
+            if pipelines == self.pipelines:
+                return False
+
+        self.show_pipelines(pipelines)
+        return True
+
+    @work(exclusive=True, name="Pipeline Updatetor")
+    async def start_pipeline_updator(self) -> None:
+        self.log.info(f"Pipeline updator started")
 
+        # a running collector already polls for us, just follow its snapshots
+        client = await CollectorClient.connect(await asyncio.to_thread(socket_path))
+        if client is not None:
+            self.log.info("Attached to collector")
+            engine.remote = client
+            # the collector polls running pipelines for every ui, rows stop doing it
+            self.update_activity_timers()
+
+            async for event in client.subscribe():
+                if event["op"] == "jobs":
+                    self.on_collector_jobs(event)
+                else:
+                    self.show_pipelines(raw_pipeline_to_pipeline(event["pipelines"]))
+
+            engine.remote = None
+            self.log.info("Collector went away, polling by ourselves")
+            self.update_activity_timers()
+
+        # resolving takes a git subprocess and two api calls, start from last time's answer
+        projects = await asyncio.to_thread(get_cached_watched_projects)
+        revalidate = projects is not None
+        if projects is None:
+            projects = await asyncio.to_thread(get_watched_projects)
+
+        poller = self.poller = build_poller(projects)
+
+        cached_pipelines = poller.get_pipelines()
+        if self.INCREMENTAL_POLLING and len(cached_pipelines) > 0:
+            self.show_pipelines(raw_pipeline_to_pipeline(cached_pipelines))
+
+        base_interval = (
+            self.WEBHOOK_CHECK_INTERVAL_SEC
+            if Config.webhooks()
+            else self.REQUEST_INTERVAL_SEC
+        )
+        request_interval = base_interval
+        history_started = False
+        while self.worker_running:
             self.log.info("Updating!")
-            self.pipelines = raw_pipeline_to_pipeline(get_pipelines(project))
+            self.log.debug(cache_stats())
+
+            try:
+                changed = await self.update_pipelines(poller, list(projects))
+            except FETCH_ERRORS as error:
+                self.log.warning(f"Polling failed: {error}")
+                changed = False
+
+            # back off while the project is quiet or failing, snap back as soon as it isn't
+            if changed:
+                request_interval = base_interval
+            else:
+                request_interval = min(
+                    request_interval * self.REQUEST_BACKOFF,
+                    self.MAX_REQUEST_INTERVAL_SEC,
+                )
+
+            # older pages only need fetching once, after the head page is up
+            if self.INCREMENTAL_POLLING and not history_started:
+                history_started = True
+                self.load_history(poller)
 
-            self.query_one(PipelineList).update_pipeline_list(self.pipelines)
-            self.worker_last_update = time.time()
+            # checking the cached projects can wait until the list is on screen
+            if revalidate:
+                revalidate = False
+                self.revalidate_watched_projects(projects)
+
+            await asyncio.sleep(request_interval)
+
+    @work(exclusive=True, group="projects", name="Project Resolver")
+    async def revalidate_watched_projects(self, projects: dict[int, str]) -> None:
+        try:
+            resolved = await asyncio.to_thread(refresh_watched_projects)
+        except Exception as e:
+            self.log.error(e)
+            return
+
+        if resolved != projects:
+            self.log.info("Watched projects changed, restarting the updator")
+            self.start_pipeline_updator()
+
+    @work(exclusive=True, group="history", name="Pipeline History")
+    async def load_history(self, poller: Poller) -> None:
+        try:
+            async for _ in poller.iter_history():
+                self.show_pipelines(raw_pipeline_to_pipeline(poller.get_pipelines()))
+        except FETCH_ERRORS as error:
+            # the pages we did get stay, the head page keeps polling
+            self.log.warning(f"Loading history failed: {error}")
+
+    @work(group="webhooks", name="Webhook Receiver")
+    async def start_webhooks(self) -> None:
+        receiver = WebhookReceiver(self.on_pipeline_event, self.on_job_event)
+        await receiver.start()
+        self.webhooks = receiver
+
+    def on_pipeline_event(
+        self, raw: dict[str, Any], raw_jobs: list[dict[str, Any]]
+    ) -> None:
+        if self.poller is None:
+            return
+
+        pushed = self.poller.push(raw)
+        if pushed is None:
+            return
+
+        # seeded under the stored updated_at, so the row finds them fresh
+        if len(raw_jobs) > 0:
+            store_pipeline_jobs(
+                pushed["id"],
+                raw_jobs,
+                parse_timestamp(pushed["updated_at"]),
+                pushed["status"],
+            )
+
+        self.show_pipelines(raw_pipeline_to_pipeline(self.poller.get_pipelines()))
+
+    def on_collector_jobs(self, event: dict[str, Any]) -> None:
+        # stored first, a row refreshing for the snapshot after this finds them fresh
+        store_pipeline_jobs(
+            event["pipeline_id"], event["jobs"], event["updated_at"], event["status"]
+        )
+
+        for item in self.query(PipelineListItem):
+            if item.pipeline.id == event["pipeline_id"]:
+                item.apply_jobs(event["jobs"])
+
+    def update_activity_timers(self) -> None:
+        for item in self.query(PipelineListItem):
+            item.update_activity_timer()
+
+    def on_job_event(self, pipeline_id: int, raw_job: dict[str, Any]) -> None:
+        store_pipeline_job(pipeline_id, raw_job)
+
+        for item in self.query(PipelineListItem):
+            if item.pipeline.id == pipeline_id:
+                item.apply_job(raw_job)
+
+    def metrics_snapshot(self) -> dict[str, Any]:
+        return {
+            **metrics.snapshot(),
+            "workers": sum(1 for worker in self.workers if worker.is_running),
+            "scheduler": {
+                "active": engine.scheduler.active,
+                "queued": engine.scheduler.queue_depth,
+                "throttled": engine.scheduler.throttled,
+            },
+            "caches": hit_rates(
+                {
+                    **cache_stats(),
+                    "avatars": canvas_cache.stats(),
+                    "pills": pill_cache_stats(),
+                }
+            ),
+        }
+
+    def dump_metrics(self) -> None:
+        dump_metrics(Config.METRICS_FILE, self.metrics_snapshot())
+
+    def action_toggle_metrics(self) -> None:
+        self.query_one(MetricsOverlay).toggle()
+
+    def tick_clock(self) -> None:
+        now = time.time()
+        for timings in self.query(PipelineTimings):
+            timings.tick(now)
 
     def on_mount(self) -> None:
         self.start_pipeline_updator()
+        self.set_interval(self.CLOCK_INTERVAL_SEC, self.tick_clock)
+
+        if Config.webhooks():
+            self.start_webhooks()
+
+        if Config.METRICS_FILE != "":
+            self.set_interval(Config.METRICS_INTERVAL_SEC, self.dump_metrics)
 
     def compose(self) -> ComposeResult:
         yield PipelineList(self.pipelines)
+        yield MetricsOverlay(self.metrics_snapshot)
@@ -0,0 +1,373 @@
+import asyncio
+import base64
+import hashlib
+import itertools
+import json
+import logging
+import os
+from typing import Any, AsyncIterator, Mapping
+
+import aiohttp
+from multidict import CIMultiDict
+from platformdirs import user_runtime_dir
+
+from .cache import MemoryCache
+from .data import parse_timestamp
+from .engine import FETCH_ERRORS, FetchError, Response
+from .gitlab_api import (
+    Config,
+    engine,
+    get_pipeline,
+    get_project_path,
+    get_watched_projects,
+    is_finished,
+    stream_pipeline_jobs,
+)
+from .polling import Poller, build_poller
+from .scheduler import Priority
+
+log = logging.getLogger(__name__)
+
+# messages are newline-delimited json, a full pipeline list has to fit in one
+STREAM_LIMIT = 16 * 1024 * 1024
+
+
+def socket_path() -> str:
+    if Config.COLLECTOR_SOCKET != "":
+        return Config.COLLECTOR_SOCKET
+
+    # one collector per instance and set of watched projects
+    watched = Config.GROUP or ",".join(Config.PROJECTS) or get_project_path()
+    digest = hashlib.sha1(f"{Config.GITLAB_URL}|{watched}".encode()).hexdigest()
+
+    return os.path.join(
+        user_runtime_dir("pipeline-manager"), f"collector-{digest[:12]}.sock"
+    )
+
+
+def encode(message: dict[str, Any]) -> bytes:
+    return json.dumps(message).encode() + b"\n"
+
+
+class Collector:
+    REQUEST_INTERVAL_SEC = 3
+    MAX_REQUEST_INTERVAL_SEC = 120
+    REQUEST_BACKOFF = 2
+    # running pipelines are polled here once, not by every attached ui's rows
+    ACTIVE_POLL_INTERVAL_SEC = 5
+    # clients asking for the same thing within this window share one request
+    SHARE_RESPONSES_SEC = 2
+
+    def __init__(self, poller: Poller) -> None:
+        self.poller = poller
+        self.subscribers: set[asyncio.StreamWriter] = set()
+        self.responses = MemoryCache(1024, ttl=self.SHARE_RESPONSES_SEC)
+        # the last jobs message per running pipeline, new subscribers get them too
+        self.jobs: dict[int, bytes] = {}
+
+    def snapshot(self) -> bytes:
+        return encode({"op": "pipelines", "pipelines": self.poller.get_pipelines()})
+
+    def publish(self) -> None:
+        self.broadcast(self.snapshot())
+
+    def broadcast(self, message: bytes) -> None:
+        for writer in self.subscribers:
+            writer.write(message)
+
+    async def run_active_poller(self) -> None:
+        while True:
+            await asyncio.sleep(self.ACTIVE_POLL_INTERVAL_SEC)
+            await self.poll_active()
+
+    async def poll_active(self) -> None:
+        active = [
+            raw for raw in self.poller.get_pipelines() if not is_finished(raw["status"])
+        ]
+        changed = await asyncio.gather(*(self.poll_pipeline(raw) for raw in active))
+
+        # jobs went out first, so rows find them when the new snapshot lands
+        if any(changed):
+            self.publish()
+
+    async def poll_pipeline(self, known: dict[str, Any]) -> bool:
+        try:
+            raw = await get_pipeline(
+                known["project_id"], known["id"], priority=Priority.VISIBLE_ROW
+            )
+
+            # jobs move through a stage without touching the pipeline itself
+            raw_jobs: list[dict[str, Any]] = []
+            async for page in stream_pipeline_jobs(
+                raw["project_id"],
+                raw["id"],
+                parse_timestamp(raw["updated_at"]),
+                raw["status"],
+                priority=Priority.VISIBLE_ROW,
+            ):
+                raw_jobs.extend(page)
+        except FETCH_ERRORS as error:
+            log.warning("Polling pipeline %s failed: %s", known["id"], error)
+            return False
+
+        message = encode(
+            {
+                "op": "jobs",
+                "pipeline_id": raw["id"],
+                "updated_at": parse_timestamp(raw["updated_at"]),
+                "status": raw["status"],
+                "jobs": raw_jobs,
+            }
+        )
+        if self.jobs.get(raw["id"]) != message:
+            self.broadcast(message)
+
+        if is_finished(raw["status"]):
+            self.jobs.pop(raw["id"], None)
+        else:
+            self.jobs[raw["id"]] = message
+
+        changed = (raw["status"], raw["updated_at"]) != (
+            known["status"],
+            known["updated_at"],
+        )
+        return changed and self.poller.push(raw) is not None
+
+    async def run_poller(self) -> None:
+        request_interval = self.REQUEST_INTERVAL_SEC
+        history: asyncio.Task[None] | None = None
+
+        while True:
+            try:
+                changed = await self.poller.poll()
+            except FETCH_ERRORS as error:
+                log.warning("Polling failed: %s", error)
+                changed = False
+
+            if changed:
+                self.publish()
+                request_interval = self.REQUEST_INTERVAL_SEC
+            else:
+                request_interval = min(
+                    request_interval * self.REQUEST_BACKOFF,
+                    self.MAX_REQUEST_INTERVAL_SEC,
+                )
+
+            if history is None:
+                history = asyncio.create_task(self.load_history())
+
+            await asyncio.sleep(request_interval)
+
+    async def load_history(self) -> None:
+        async for _ in self.poller.iter_history():
+            self.publish()
+
+    async def handle_client(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        answers: set[asyncio.Task[None]] = set()
+
+        try:
+            while line := await reader.readline():
+                message = json.loads(line)
+
+                if message["op"] == "subscribe":
+                    self.subscribers.add(writer)
+                    for jobs in self.jobs.values():
+                        writer.write(jobs)
+
+                    writer.write(self.snapshot())
+                elif message["op"] == "request":
+                    task = asyncio.create_task(self.answer(writer, message))
+                    answers.add(task)
+                    task.add_done_callback(answers.discard)
+        except (ConnectionError, ValueError) as error:
+            log.info("Dropping client: %s", error)
+        except asyncio.CancelledError:
+            # shutting down, streams logs an error for handlers that end cancelled
+            pass
+        finally:
+            self.subscribers.discard(writer)
+            for task in answers:
+                task.cancel()
+
+            writer.close()
+
+    async def answer(
+        self, writer: asyncio.StreamWriter, message: dict[str, Any]
+    ) -> None:
+        key = json.dumps(
+            [
+                message["method"],
+                message["url"],
+                message["params"],
+                message["headers"],
+                message["json"],
+            ],
+            sort_keys=True,
+        )
+
+        try:
+            response = self.responses.get(key)
+            if response is None:
+                response = await engine.request(
+                    message["url"],
+                    message["params"],
+                    message["headers"],
+                    Priority(message["priority"]),
+                    message["method"],
+                    message["json"],
+                )
+
+                if message["method"] == "GET":
+                    self.responses.set(key, response)
+
+            reply = {
+                "op": "response",
+                "id": message["id"],
+                "status": response.status,
+                "headers": list(response.headers.items()),
+                "body": base64.b64encode(response.body).decode(),
+            }
+        except FetchError as error:
+            reply = {"op": "error", "id": message["id"], "status": error.status}
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            reply = {"op": "error", "id": message["id"], "status": 502}
+
+        writer.write(encode(reply))
+
+
+class CollectorClient:
+    def __init__(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        self.reader = reader
+        self.writer = writer
+        self.closed = False
+        self.pending: dict[int, asyncio.Future[dict[str, Any]]] = {}
+        # pipelines snapshots and jobs of running pipelines, in the order sent
+        self.events: asyncio.Queue[dict[str, Any] | None] = asyncio.Queue()
+
+        self._ids = itertools.count()
+        self._reader_task = asyncio.create_task(self._read())
+
+    @classmethod
+    async def connect(cls, path: str) -> "CollectorClient | None":
+        try:
+            reader, writer = await asyncio.open_unix_connection(
+                path, limit=STREAM_LIMIT
+            )
+        except OSError:
+            return None
+
+        return cls(reader, writer)
+
+    async def _read(self) -> None:
+        try:
+            while line := await self.reader.readline():
+                message = json.loads(line)
+
+                if message["op"] in ("pipelines", "jobs"):
+                    self.events.put_nowait(message)
+                    continue
+
+                future = self.pending.pop(message["id"], None)
+                if future is not None and not future.done():
+                    future.set_result(message)
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            self.closed = True
+            self.events.put_nowait(None)
+
+            for future in self.pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("collector went away"))
+
+    async def subscribe(self) -> AsyncIterator[dict[str, Any]]:
+        self.writer.write(encode({"op": "subscribe"}))
+
+        while (event := await self.events.get()) is not None:
+            yield event
+
+    async def request(
+        self,
+        url: str,
+        params: Mapping[str, Any] | None,
+        headers: Mapping[str, str] | None,
+        priority: Priority,
+        method: str,
+        json_body: Any,
+    ) -> Response:
+        if self.closed:
+            raise ConnectionError("collector went away")
+
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self.pending[request_id] = future
+
+        self.writer.write(
+            encode(
+                {
+                    "op": "request",
+                    "id": request_id,
+                    "url": url,
+                    "params": dict(params or {}),
+                    "headers": dict(headers or {}),
+                    "priority": int(priority),
+                    "method": method,
+                    "json": json_body,
+                }
+            )
+        )
+
+        try:
+            message = await future
+        finally:
+            self.pending.pop(request_id, None)
+
+        if message["op"] == "error":
+            raise FetchError(url, message["status"], method)
+
+        return Response(
+            url,
+            message["status"],
+            CIMultiDict(message["headers"]),
+            base64.b64decode(message["body"]),
+        )
+
+    async def close(self) -> None:
+        self.writer.close()
+        self._reader_task.cancel()
+
+
+async def run_collector() -> None:
+    path = socket_path()
+
+    running = await CollectorClient.connect(path)
+    if running is not None:
+        await running.close()
+        raise SystemExit(f"A collector is already listening on {path}")
+
+    os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+    if os.path.exists(path):
+        os.unlink(path)
+
+    projects = await asyncio.to_thread(get_watched_projects)
+    collector = Collector(build_poller(projects))
+
+    server = await asyncio.start_unix_server(
+        collector.handle_client, path, limit=STREAM_LIMIT
+    )
+    # whoever can connect gets requests made with our token
+    os.chmod(path, 0o600)
+    log.info("Collecting %s on %s", ", ".join(projects.values()), path)
+
+    active = asyncio.create_task(collector.run_active_poller())
+    try:
+        async with server:
+            await collector.run_poller()
+    finally:
+        active.cancel()
+        os.unlink(path)
+        await engine.close()
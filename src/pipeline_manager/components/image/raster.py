@@ -0,0 +1,34 @@
+import io
+from typing import Any
+
+import numpy as np
+from PIL import Image as PillowImage
+
+HALF_BLOCK = "▀"
+HEX_BYTES = np.array([f"{i:02X}" for i in range(256)])
+
+
+def pixels_to_hex(pixels: np.ndarray[Any, np.dtype[np.uint8]]) -> np.ndarray:
+    red = np.char.add("#", HEX_BYTES[pixels[..., 0]])
+    green_blue = np.char.add(HEX_BYTES[pixels[..., 1]], HEX_BYTES[pixels[..., 2]])
+
+    return np.char.add(red, green_blue)
+
+
+def pixels_to_canvas(pixels: np.ndarray[Any, np.dtype[np.uint8]]) -> str:
+    # every text row shows two pixel rows: top as foreground, bottom as background
+    if len(pixels) % 2 == 1:
+        pixels = np.concatenate([pixels, np.zeros_like(pixels[:1])])
+
+    colors = pixels_to_hex(pixels)
+    styles = np.char.add(np.char.add(colors[0::2], " on "), colors[1::2])
+    cells = np.char.add(np.char.add("[", styles), f"]{HALF_BLOCK}[/]")
+
+    return "\n".join("".join(row) for row in cells)
+
+
+def rasterize(data: bytes, width: int, height: int) -> str:
+    with PillowImage.open(io.BytesIO(data)) as image:
+        pixels = np.asarray(image.convert("RGB").resize((width, height)))
+
+    return pixels_to_canvas(pixels)
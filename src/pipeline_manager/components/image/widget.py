@@ -1,11 +1,7 @@
-import os
+import asyncio
 import random
-import time
-from typing import Any
 
-import numpy as np
-import requests
-from PIL import Image as PillowImage
+from rich.text import Text
 from textual import work
 from textual.app import ComposeResult
 from textual.containers import Container
@@ -13,6 +9,17 @@ from textual.reactive import reactive
 from textual.widget import Widget
 from textual.widgets import Label
 
+from ...cache import MemoryCache
+from ...gitlab_api import Config, get_avatar
+from ...metrics import counted_compose
+
+# a rendered avatar goes stale with the upload it came from
+canvas_cache = MemoryCache(256, ttl=Config.AVATAR_MAX_AGE_SEC)
+
+
+def canvas_key(src: str, width: int, height: int) -> str:
+    return f"{src}@{width}x{height}"
+
 
 class Image(Widget):
     DEFAULT_CSS = """
@@ -31,11 +38,7 @@ class Image(Widget):
         }
     """
 
-    @staticmethod
-    def rgba_to_hex(rgba: tuple[int, int, int, int]) -> str:
-        return "#{:02X}{:02X}{:02X}".format(*rgba[:3:])
-
-    canvas = reactive("", recompose=True, repaint=True)
+    canvas = reactive(Text(), recompose=True, repaint=True)
 
     def __init__(
         self,
@@ -50,12 +53,15 @@ class Image(Widget):
         super().__init__(name=name, id=id, classes=classes, disabled=disabled)
 
         self.src = src
-        self.raw_data: np.ndarray[Any, np.dtype[Any]] = np.ndarray(1)
-
         self.init_width = init_width
         self.init_height = init_height
-        self.canvas = self.random_canvas()
 
+        cached = canvas_cache.get(canvas_key(src, init_width, init_height))
+        if cached is not None:
+            self.canvas = cached
+            return
+
+        self.canvas = Text.from_markup(self.random_canvas())
         self.render_image()
 
     def is_remote(self) -> bool:
@@ -70,8 +76,7 @@ class Image(Widget):
         return f"[{top_color} on {bottom_color}]{pixel}[/{top_color} on {bottom_color}]"
 
     async def load_image(self) -> bytes:
-        with requests.get(self.src) as r:
-            return r.content
+        return await get_avatar(self.src)
 
     def random_canvas(self) -> str:
         return "\n".join(
@@ -85,51 +90,33 @@ class Image(Widget):
                         for _ in range(self.init_width)
                     ]
                 )
-                for _ in range(self.init_height)
+                for _ in range((self.init_height + 1) // 2)
             ]
         )
 
-    async def build_canvas(self) -> str:
-        canvas = ""
-
-        self.log.debug(self.raw_data)
-        for i in range(len(self.raw_data) - 1):
-            for j in range(len(self.raw_data[0])):
-                top_col = self.rgba_to_hex(self.raw_data[i][j])
-                bot_col = self.rgba_to_hex(self.raw_data[i + 1][j])
-
-                pix = self._make_pixel(top_col, bot_col)
-                canvas += pix
-            canvas += "\n"
-
-        return canvas
-
-    @work(thread=True)
+    @work(exclusive=True)
     async def render_image(self) -> None:
-        path = f"temp-{random.randint(1000, 100000)}"
-        temp_file: Any = open(path, "wb")
-
         try:
-            data = await self.load_image()
-            temp_file.write(data)
+            # numpy and pillow only load once the first avatar arrives
+            from .raster import rasterize
 
-            temp_file.close()
-            temp_file = open(path, "rb")
-
-            image = PillowImage.open(temp_file)
-            self.raw_data = np.asarray(
-                image.resize((self.init_width, self.init_height))
+            data = await self.load_image()
+            # decoding a large upload takes milliseconds, keep it off the event loop
+            markup = await asyncio.to_thread(
+                rasterize, data, self.init_width, self.init_height
             )
+            # cached parsed, every row showing this avatar reuses the same text
+            canvas = Text.from_markup(markup)
 
-            self.canvas = await self.build_canvas()
+            canvas_cache.set(
+                canvas_key(self.src, self.init_width, self.init_height), canvas
+            )
+            self.canvas = canvas
 
         except Exception as e:
             self.log.error(e)
 
-        finally:
-            temp_file.close()
-            os.remove(path)
-
+    @counted_compose
     def compose(self) -> ComposeResult:
         with Container():
             yield Label(self.canvas)
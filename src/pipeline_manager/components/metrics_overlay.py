@@ -0,0 +1,105 @@
+from typing import Any, Callable
+
+from rich.console import Group
+from rich.table import Table
+from textual.widgets import Static
+
+
+def build_table(title: str, *columns: str) -> Table:
+    table = Table(title=title, title_justify="left", box=None, expand=True)
+    table.add_column(columns[0], overflow="fold")
+    for column in columns[1:]:
+        table.add_column(column, justify="right")
+
+    return table
+
+
+class MetricsOverlay(Static):
+    DEFAULT_CSS = """
+        MetricsOverlay {
+            display: none;
+            overlay: screen;
+            dock: right;
+            width: 72;
+            height: 100%;
+            padding: 0 1;
+            background: $panel;
+            border-left: vkey $primary;
+        }
+    """
+
+    REFRESH_INTERVAL_SEC = 1
+
+    def __init__(
+        self,
+        source: Callable[[], dict[str, Any]],
+        name: str | None = None,
+        id: str | None = None,
+        classes: str | None = None,
+        disabled: bool = False,
+    ) -> None:
+        super().__init__(name=name, id=id, classes=classes, disabled=disabled)
+        self.source = source
+
+    def on_mount(self) -> None:
+        self.set_interval(self.REFRESH_INTERVAL_SEC, self.refresh_metrics)
+
+    def toggle(self) -> None:
+        self.display = not self.display
+        self.refresh_metrics()
+
+    def refresh_metrics(self) -> None:
+        if not self.display:
+            return
+
+        snapshot = self.source()
+
+        requests = build_table(
+            "Requests", "endpoint", "n", "dedup", "err", "p50", "p95", "max"
+        )
+        for endpoint, stats in snapshot["requests"].items():
+            requests.add_row(
+                endpoint.replace("/api/v4", ""),
+                str(stats["count"]),
+                str(stats["deduplicated"]),
+                str(stats["errors"]),
+                f"{stats['p50_ms']:.0f}",
+                f"{stats['p95_ms']:.0f}",
+                f"{stats['max_ms']:.0f}",
+            )
+
+        calls = build_table("Calls", "function", "n", "p50", "p95")
+        for function, stats in snapshot["calls"].items():
+            calls.add_row(
+                function,
+                str(stats["count"]),
+                f"{stats['p50_ms']:.0f}",
+                f"{stats['p95_ms']:.0f}",
+            )
+
+        caches = build_table("Caches", "cache", "entries", "hit rate")
+        for cache, stats in snapshot["caches"].items():
+            rate = stats["hit_rate"]
+            caches.add_row(
+                cache, str(stats["entries"]), "-" if rate is None else f"{rate:.0%}"
+            )
+
+        widgets = build_table("Widgets", "class", "composes", "renders")
+        for widget in sorted({*snapshot["composes"], *snapshot["renders"]}):
+            widgets.add_row(
+                widget,
+                str(snapshot["composes"].get(widget, 0)),
+                str(snapshot["renders"].get(widget, 0)),
+            )
+
+        scheduler = snapshot["scheduler"]
+        self.update(
+            Group(
+                f"threads {snapshot['threads']}  workers {snapshot['workers']}  "
+                f"in flight {scheduler['active']}  queued {scheduler['queued']}",
+                requests,
+                calls,
+                caches,
+                widgets,
+            )
+        )
@@ -1,17 +1,9 @@
-from enum import Enum, IntEnum, auto
+from enum import Enum
+from functools import lru_cache
 
+from rich.text import Text as RichText
 
-# allows for > and < assertions :D
-class StatusHierarchy(IntEnum):
-    CREATED = auto()
-    PENDING = auto()
-    RUNNING = auto()
-    SUCCESS = auto()
-    WARNING = auto()
-    FAILED = auto()
-    SKIPPED = auto()
-    MANUAL = auto()
-    CANCELED = auto()
+from ..data import StatusHierarchy
 
 
 class Text(Enum):
@@ -55,29 +47,32 @@ class Icons(Enum):
     BRANCH = ""
     COMMIT = ""
     USER = ""
+    PROJECT = ""
 
 
+# rows only ever show a few dozen distinct pills, parse each one once
+PILL_CACHE_SIZE = 1024
+
+
+@lru_cache(maxsize=PILL_CACHE_SIZE)
 def build_pill(
     text: str | None,
     *,
     icon: str | None,
     text_color: str = Colors.GENERIC.value,
     pill_color: str = Colors.TEXT.value,
-) -> str:
-    color = f"{text_color} on {pill_color}"
-    left_side = f"[{pill_color}][/{pill_color}]"
-    right_side = f"[{pill_color}][/{pill_color}]"
-    icon = f"{icon} " if icon is not None else ""
-
-    if text is None:
-        text = ""
-        icon = icon[:-1:]
+) -> RichText:
+    label = " ".join(part for part in (icon, text) if part is not None)
 
-    return f"{left_side}[{color}]{icon}{text}[/{color}]{right_side}"
+    return RichText.assemble(
+        ("", pill_color),
+        (label, f"{text_color} on {pill_color}"),
+        ("", pill_color),
+    )
 
 
-def build_pipeline_pill(state: str, no_text: bool = False) -> str:
-    state = state.upper()
+def build_pipeline_pill(status: StatusHierarchy, no_text: bool = False) -> RichText:
+    state = status.name
 
     return build_pill(
         (Text[state].value if no_text is False else None),
@@ -85,3 +80,8 @@ def build_pipeline_pill(state: str, no_text: bool = False) -> str:
         text_color="white",
         pill_color=Colors[state].value,
     )
+
+
+def pill_cache_stats() -> dict[str, int]:
+    info = build_pill.cache_info()
+    return {"entries": info.currsize, "hits": info.hits, "misses": info.misses}
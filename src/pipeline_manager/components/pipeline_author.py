@@ -1,6 +1,7 @@
 import random
+from typing import Any
 
-import arrow
+from textual import work
 from textual.app import ComposeResult
 from textual.reactive import reactive
 from textual.widget import Widget
@@ -9,7 +10,9 @@ from textual.widgets import Label
 from ..components.image import Image
 from ..components.pills import Icons, build_pipeline_pill
 from ..data import Commit, Pipeline
-from ..gitlab_api import login
+from ..engine import FETCH_ERRORS
+from ..gitlab_api import UNKNOWN_USER, get_cached_user, get_user
+from ..metrics import counted_compose
 
 
 class PipelineAuthor(Widget):
@@ -22,6 +25,8 @@ class PipelineAuthor(Widget):
         }
     """
 
+    user: reactive[dict[str, Any] | None] = reactive(None, recompose=True)
+
     def __init__(
         self,
         commit: Commit,
@@ -33,10 +38,23 @@ class PipelineAuthor(Widget):
         super().__init__(name=name, id=id, classes=classes, disabled=disabled)
 
         self.commit = commit
-        gl = login()
+        self.user = get_cached_user(self.commit.author_name)
+
+    def on_mount(self) -> None:
+        if self.user is None:
+            self.fetch_user()
 
-        self.user = list(gl.users.list(username=self.commit.author_name))[0]
-        self.log.debug(self.user.avatar_url)
+    @work(exclusive=True)
+    async def fetch_user(self) -> None:
+        try:
+            self.user = await get_user(self.commit.author_name)
+        except FETCH_ERRORS as error:
+            # no avatar until the row is built again
+            self.log.warning(f"Looking up {self.commit.author_name} failed: {error}")
 
+    @counted_compose
     def compose(self) -> ComposeResult:
-        yield Image(self.user.avatar_url, 6, 6)
+        if self.user is None or self.user is UNKNOWN_USER:
+            return
+
+        yield Image(self.user["avatar_url"], 6, 6)
@@ -1,10 +1,52 @@
+from rich.text import Text
 from textual.app import ComposeResult
-from textual.reactive import reactive
 from textual.widget import Widget
 from textual.widgets import Label
 
 from ..components.pills import Colors, Icons, build_pill
 from ..data import Commit, Pipeline
+from ..gitlab_api import Config
+from ..metrics import counted_compose
+
+SECTION_SEPARATOR = Text("  ")
+
+
+def build_sections(pipeline: Pipeline, commit: Commit) -> Text:
+    sections = [
+        Text(f"#{pipeline.id}", style="blue"),
+        build_pill(
+            pipeline.ref,
+            icon=Icons.BRANCH.value,
+            text_color=Colors.TEXT.value,
+            pill_color=Colors.GENERIC.value,
+        ),
+        build_pill(
+            pipeline.sha[:8:],
+            icon=Icons.COMMIT.value,
+            text_color=Colors.TEXT.value,
+            pill_color=Colors.GENERIC.value,
+        ),
+        build_pill(
+            commit.author_name,
+            icon=Icons.USER.value,
+            text_color=Colors.TEXT.value,
+            pill_color=Colors.GENERIC.value,
+        ),
+    ]
+    if Config.multi_project():
+        # web_url is <host>/<group>/<project>/-/pipelines/<id>
+        project = pipeline.web_url.split("/-/")[0].rsplit("/", 1)[-1]
+        sections.insert(
+            1,
+            build_pill(
+                project,
+                icon=Icons.PROJECT.value,
+                text_color=Colors.TEXT.value,
+                pill_color=Colors.GENERIC.value,
+            ),
+        )
+
+    return SECTION_SEPARATOR.join(sections)
 
 
 class PipelineInfo(Widget):
@@ -15,13 +57,6 @@ class PipelineInfo(Widget):
         }
     """
 
-    title = reactive("", recompose=True, repaint=True)
-    pipeline_id = reactive(0, recompose=True, repaint=True)
-    branch = reactive("", recompose=True, repaint=True)
-    short_sha = reactive("", recompose=True, repaint=True)
-    author = reactive("", recompose=True, repaint=True)
-    is_latest = reactive(False, recompose=True, repaint=True)
-
     def __init__(
         self,
         pipeline: Pipeline,
@@ -32,48 +67,37 @@ class PipelineInfo(Widget):
         disabled: bool = False,
     ) -> None:
         super().__init__(name=name, id=id, classes=classes, disabled=disabled)
+        self.title_label = Label()
+        self.sections_label = Label()
+        self.latest_label = Label(
+            build_pill(
+                "latest",
+                icon=None,
+                text_color="white",
+                pill_color=Colors.SUCCESS.value,
+            )
+        )
+
+        self.title = Text()
+        self.sections = Text()
         self.update_pipeline(pipeline, commit)
 
-    def update_pipeline(self, pipeline: Pipeline, commit: Commit):
-        self.title = commit.title
-        self.pipeline_id = pipeline.id
-        self.branch = pipeline.ref
-        self.short_sha = pipeline.sha[:8:]
-        self.author = commit.author_name
-        self.is_latest = pipeline.is_latest
+    def update_pipeline(self, pipeline: Pipeline, commit: Commit) -> None:
+        # rebuilt in one go, labels are only updated when their text changed
+        title = Text(commit.title)  # titles are user text, not markup
+        if title != self.title:
+            self.title = title
+            self.title_label.update(title)
 
-    def compose(self) -> ComposeResult:
-        yield Label(self.title)
+        sections = build_sections(pipeline, commit)
+        if sections != self.sections:
+            self.sections = sections
+            self.sections_label.update(sections)
 
-        sections = [
-            f"[blue]#{self.pipeline_id}[/blue]",
-            build_pill(
-                self.branch,
-                icon=Icons.BRANCH.value,
-                text_color=Colors.TEXT.value,
-                pill_color=Colors.GENERIC.value,
-            ),
-            build_pill(
-                self.short_sha,
-                icon=Icons.COMMIT.value,
-                text_color=Colors.TEXT.value,
-                pill_color=Colors.GENERIC.value,
-            ),
-            build_pill(
-                self.author,
-                icon=Icons.USER.value,
-                text_color=Colors.TEXT.value,
-                pill_color=Colors.GENERIC.value,
-            ),
-        ]
-        yield Label("  ".join(sections))
+        self.latest_label.display = pipeline.is_latest
 
-        if self.is_latest:
-            yield Label(
-                build_pill(
-                    "latest",
-                    icon=None,
-                    text_color="white",
-                    pill_color=Colors.SUCCESS.value,
-                )
-            )
+    @counted_compose
+    def compose(self) -> ComposeResult:
+        yield self.title_label
+        yield self.sections_label
+        yield self.latest_label
@@ -1,14 +1,14 @@
 from textual.app import ComposeResult
 from textual.containers import VerticalScroll
-from textual.reactive import reactive
 from textual.widget import Widget
 
 from ..components.pipeline_list_item import PipelineListItem
 from ..data import Pipeline
+from ..metrics import counted_compose
 
 
 class PipelineList(Widget):
-    pipelines: reactive[list[Pipeline]] = reactive([], recompose=True)
+    OVERSCAN_ROWS = 5
 
     def __init__(
         self,
@@ -21,10 +21,79 @@ class PipelineList(Widget):
         super().__init__(name=name, id=id, classes=classes, disabled=disabled)
         self.pipelines = pipelines
 
+    def on_mount(self) -> None:
+        self.watch(
+            self.query_one(VerticalScroll), "scroll_y", self.materialize_visible_rows
+        )
+
+    def on_resize(self) -> None:
+        self.call_after_refresh(self.materialize_visible_rows)
+
+    def materialize_visible_rows(self) -> None:
+        container = self.query_one(VerticalScroll)
+        items = list(container.query_children(PipelineListItem))
+        if len(items) == 0:
+            return
+
+        row_height = items[0].outer_size.height or 7
+        first = int(container.scroll_y // row_height) - self.OVERSCAN_ROWS
+        last = (
+            int((container.scroll_y + container.size.height) // row_height)
+            + self.OVERSCAN_ROWS
+        )
+
+        # rows that scrolled out of the window go back to placeholders, so a long
+        # history costs what a screenful does
+        for index, item in enumerate(items):
+            if first <= index <= last:
+                item.materialize()
+            else:
+                item.dematerialize()
+
+    @staticmethod
+    def item_id(pipeline: Pipeline) -> str:
+        return f"pipeline-{pipeline.id}"
+
     def update_pipeline_list(self, new_pipelines: list[Pipeline]) -> None:
         self.pipelines = new_pipelines
 
+        containers = self.query(VerticalScroll)
+        if len(containers) == 0:
+            return
+
+        container = containers.first()
+        existing = {
+            item.pipeline.id: item
+            for item in container.query_children(PipelineListItem)
+        }
+        wanted = {p.id for p in new_pipelines}
+
+        for pipeline_id, item in existing.items():
+            if pipeline_id not in wanted:
+                item.remove()
+
+        previous: PipelineListItem | None = None
+        for p in new_pipelines:
+            item = existing.get(p.id)
+
+            if item is not None:
+                item.update_pipeline(p)
+            else:
+                item = PipelineListItem(p, id=self.item_id(p))
+
+                if previous is not None:
+                    container.mount(item, after=previous)
+                elif len(container.children) > 0:
+                    container.mount(item, before=0)
+                else:
+                    container.mount(item)
+
+            previous = item
+
+        self.call_after_refresh(self.materialize_visible_rows)
+
+    @counted_compose
     def compose(self) -> ComposeResult:
         with VerticalScroll():
             for p in self.pipelines:
-                yield PipelineListItem(p)
+                yield PipelineListItem(p, id=self.item_id(p))
@@ -1,22 +1,36 @@
 import time
-from typing import List, TypeAlias
+from dataclasses import replace
+from typing import Any, AsyncIterator, List, TypeAlias
 
-from gitlab.base import RESTObject, RESTObjectList
-from gitlab.v4.objects import pipelines
+from rich.text import Text
 from textual import work
-from textual.app import App, ComposeResult
+from textual.app import App, ComposeResult, RenderResult
 from textual.containers import Container, Horizontal, Vertical, VerticalScroll
 from textual.reactive import reactive
+from textual.timer import Timer
 from textual.widget import Widget
-from textual.widgets import Label, Rule
+from textual.widgets import Rule
 
 from ..components.pipeline_author import PipelineAuthor
 from ..components.pipeline_info import PipelineInfo
 from ..components.pipeline_jobs_preview import PipelineJobsPreview
 from ..components.pipeline_timings import PipelineTimings
-from ..data import Commit, Job, Pipeline
-from ..gitlab_api import get_current_project, get_pipelines
+from ..data import Commit, Pipeline, PipelineJobs
+from ..engine import FETCH_ERRORS
+from ..gitlab_api import (
+    Config,
+    engine,
+    get_cached_commit,
+    get_cached_pipeline_jobs,
+    get_commit,
+    get_pipeline,
+    get_pipelines,
+    is_finished,
+    stream_pipeline_jobs,
+)
 from ..mappers import raw_commit_to_commit, raw_jobs_to_jobs, raw_pipeline_to_pipeline
+from ..metrics import counted_compose, counted_render
+from ..scheduler import Priority
 
 
 class PipelineListItem(Widget):
@@ -38,9 +52,9 @@ class PipelineListItem(Widget):
             padding-left: 2;
         }
     """
-    pipeline: reactive[Pipeline | None] = reactive(None, recompose=True)
-    commit: reactive[Commit | None] = reactive(None, recompose=True)
-    jobs: reactive[list[Job] | None] = reactive(None, recompose=True)
+    loaded = reactive(False, recompose=True)
+    ACTIVE_POLL_INTERVAL_SEC = 5
+    RETRY_AFTER_SEC = 5
 
     def __init__(
         self,
@@ -52,24 +66,213 @@ class PipelineListItem(Widget):
     ) -> None:
         super().__init__(name=name, id=id, classes=classes, disabled=disabled)
         self.pipeline = pipeline
+        self.commit: Commit | None = None
+        self.jobs: PipelineJobs | None = None
+        self.materialized = False
+        self.active_timer: Timer | None = None
+        self.retry_timer: Timer | None = None
+
+    def materialize(self) -> None:
+        if self.materialized:
+            return
+
+        self.materialized = True
+        self.load_cached_data()
+        self.fetch_data()
+        self.update_activity_timer()
+
+    def dematerialize(self) -> None:
+        # back to a placeholder, the caches have what a later materialize needs
+        if not self.materialized and not self.loaded and self.retry_timer is None:
+            return
+
+        self.materialized = False
+        self.workers.cancel_node(self)
+
+        for timer in (self.active_timer, self.retry_timer):
+            if timer is not None:
+                timer.stop()
+
+        self.active_timer = None
+        self.retry_timer = None
+
         self.commit = None
         self.jobs = None
+        self.loaded = False
 
-        self.fetch_data()
+    def update_activity_timer(self) -> None:
+        # job events keep running rows current when webhooks are on, and so does
+        # the collector when attached to one
+        finished = (
+            not self.materialized
+            or is_finished(self.pipeline.status)
+            or Config.webhooks()
+            or engine.remote is not None
+        )
+
+        if not finished and self.active_timer is None:
+            self.active_timer = self.set_interval(
+                self.ACTIVE_POLL_INTERVAL_SEC, self.poll_active
+            )
+        elif finished and self.active_timer is not None:
+            self.active_timer.stop()
+            self.active_timer = None
+
+    def load_cached_data(self) -> None:
+        raw_commit = get_cached_commit(self.pipeline.sha)
+        cached_jobs = get_cached_pipeline_jobs(self.pipeline.id)
+
+        if raw_commit is None or cached_jobs is None:
+            return
+
+        self.commit = raw_commit_to_commit(raw_commit)
+        self.jobs = raw_jobs_to_jobs(cached_jobs.value)
+        self.loaded = True
+
+    def update_pipeline(self, pipeline: Pipeline) -> None:
+        previous = self.pipeline
+        self.pipeline = pipeline
+
+        if previous == pipeline:
+            return
+
+        for timings in self.query(PipelineTimings):
+            timings.update_pipeline(pipeline)
+
+        if self.commit is not None:
+            for info in self.query(PipelineInfo):
+                info.update_pipeline(pipeline, self.commit)
+
+        if not self.materialized:
+            return
+
+        self.update_activity_timer()
+
+        if previous.updated_at != pipeline.updated_at:
+            self.refresh_jobs()
+
+    @property
+    def priority(self) -> Priority:
+        if self.is_mounted and self.screen.can_view_partial(self):
+            return Priority.VISIBLE_ROW
+
+        return Priority.OFFSCREEN_ROW
+
+    async def stream_jobs(self) -> AsyncIterator[PipelineJobs]:
+        jobs = self.jobs if self.jobs is not None else PipelineJobs()
+        seen: set[int] = set()
+
+        async for page in stream_pipeline_jobs(
+            self.pipeline.project_id,
+            self.pipeline.id,
+            self.pipeline.updated_at,
+            self.pipeline.status,
+            priority=self.priority,
+        ):
+            raw_jobs_to_jobs(page, into=jobs)
+            seen.update(raw["id"] for raw in page)
+
+            yield jobs
+
+        # drop jobs the previous load had but this one no longer returned
+        stale = [job_id for job_id in jobs.by_id if job_id not in seen]
+        if len(stale) > 0:
+            for job_id in stale:
+                jobs.remove(job_id)
+
+            yield jobs
 
-    @work(exclusive=False, thread=True)
-    def fetch_data(self) -> None:
-        if self.pipeline is None:
+    def apply_job(self, raw_job: dict[str, Any]) -> None:
+        if self.jobs is None:
             return
 
-        project = get_current_project()
-        self.commit = raw_commit_to_commit(project.commits.get(self.pipeline.sha))
-        self.jobs = raw_jobs_to_jobs(
-            project.pipelines.get(self.pipeline.id).jobs.list(get_all=False)
+        raw_jobs_to_jobs([raw_job], into=self.jobs)
+        self.set_jobs(self.jobs)
+
+    def apply_jobs(self, raw_jobs: list[dict[str, Any]]) -> None:
+        if self.jobs is None:
+            return
+
+        # the whole list, anything it no longer has goes
+        self.set_jobs(raw_jobs_to_jobs(raw_jobs))
+
+    def set_data(self, commit: Commit, jobs: PipelineJobs) -> None:
+        self.commit = commit
+
+        if self.loaded:
+            self.set_jobs(jobs)
+            return
+
+        self.jobs = jobs
+        self.loaded = True
+
+    def set_jobs(self, jobs: PipelineJobs) -> None:
+        self.jobs = jobs
+
+        for preview in self.query(PipelineJobsPreview):
+            preview.update_jobs(jobs)
+
+    # both streams change self.jobs in place, so a newer one replaces the older
+    @work(exclusive=True, group="jobs")
+    async def fetch_data(self) -> None:
+        try:
+            commit = raw_commit_to_commit(
+                await get_commit(
+                    self.pipeline.project_id, self.pipeline.sha, priority=self.priority
+                )
+            )
+
+            async for jobs in self.stream_jobs():
+                self.set_data(commit, jobs)
+        except FETCH_ERRORS as error:
+            # the row keeps what it has and tries again a little later
+            self.log.warning(f"Loading pipeline {self.pipeline.id} failed: {error}")
+            self.materialized = False
+            self.retry_timer = self.set_timer(self.RETRY_AFTER_SEC, self.retry)
+
+    def retry(self) -> None:
+        self.retry_timer = None
+        self.materialize()
+
+    @work(exclusive=True, group="poll-active")
+    async def poll_active(self) -> None:
+        try:
+            raw = await get_pipeline(
+                self.pipeline.project_id, self.pipeline.id, priority=self.priority
+            )
+        except FETCH_ERRORS as error:
+            self.log.warning(f"Polling pipeline {self.pipeline.id} failed: {error}")
+            return
+
+        pipeline = replace(
+            raw_pipeline_to_pipeline([raw])[0], is_latest=self.pipeline.is_latest
         )
 
+        if pipeline == self.pipeline:
+            # jobs move through a stage without touching the pipeline itself
+            self.refresh_jobs()
+            return
+
+        self.update_pipeline(pipeline)
+
+    def refresh_jobs(self) -> None:
+        # replacing a first load that has no commit yet would leave the row empty
+        if self.commit is None:
+            self.fetch_data()
+        else:
+            self.stream_job_updates()
+
+    @work(exclusive=True, group="jobs")
+    async def stream_job_updates(self) -> None:
+        try:
+            async for jobs in self.stream_jobs():
+                self.set_jobs(jobs)
+        except FETCH_ERRORS as error:
+            self.log.warning(f"Refreshing jobs of {self.pipeline.id} failed: {error}")
+
+    @counted_compose
     def compose(self) -> ComposeResult:
-        if self.pipeline is None or self.commit is None or self.jobs is None:
+        if not self.loaded or self.commit is None or self.jobs is None:
             yield SkeletonPipelineListItem()
             return
 
@@ -92,22 +295,24 @@ class PipelineListItem(Widget):
 
 
 class SkeletonPipelineListItem(Widget):
-    def generate_label(self, length: int = 15) -> Label:
-        return Label("[white on #323232]" + (" " * length) + "[/white on #323232]")
-
-    def compose(self) -> ComposeResult:
-        with Vertical():
-            with Horizontal():
-                with Container(classes="pipeline-line"):
-                    yield self.generate_label()
+    DEFAULT_CSS = """
+        SkeletonPipelineListItem {
+            width: 100%;
+            height: 7;
+        }
+    """
 
-                with Container(classes="pipeline-line"):
-                    yield self.generate_label()
+    @counted_render
+    def render(self) -> RenderResult:
+        column_width = self.size.width // 4
 
-                with Container(classes="pipeline-line"):
-                    yield self.generate_label()
+        skeleton = Text("\n")
+        for _ in range(4):
+            skeleton.append("  ")
+            skeleton.append(" " * 15, style="white on #323232")
+            skeleton.append(" " * max(column_width - 17, 1))
 
-                with Container(classes="pipeline-line"):
-                    yield self.generate_label()
+        skeleton.append("\n" * (self.size.height - 2))
+        skeleton.append("─" * self.size.width, style="dim")
 
-            yield Rule()
+        return skeleton
@@ -1,11 +1,53 @@
-import arrow
+import time
+from datetime import timedelta
+
+from rich.text import Text
 from textual.app import ComposeResult
-from textual.reactive import reactive
 from textual.widget import Widget
 from textual.widgets import Label
 
 from ..components.pills import Icons, build_pipeline_pill
-from ..data import Pipeline
+from ..data import Pipeline, StatusHierarchy
+from ..gitlab_api import is_finished
+from ..metrics import counted_compose
+
+MINUTE = 60
+HOUR = 60 * MINUTE
+DAY = 24 * HOUR
+WEEK = 7 * DAY
+MONTH = 2635200
+YEAR = 365 * DAY
+
+
+def format_elapsed(seconds: float) -> str:
+    return str(timedelta(seconds=int(seconds)))
+
+
+def humanize(seconds_ago: float) -> str:
+    # arrow's wording and thresholds, with months as a fixed number of seconds
+    seconds = int(seconds_ago)
+    if seconds < 10:
+        return "just now"
+
+    steps = [
+        (MINUTE, 1, "{} seconds"),
+        (2 * MINUTE, 0, "a minute"),
+        (HOUR, MINUTE, "{} minutes"),
+        (2 * HOUR, 0, "an hour"),
+        (DAY, HOUR, "{} hours"),
+        (2 * DAY, 0, "a day"),
+        (WEEK, DAY, "{} days"),
+        (2 * WEEK, 0, "a week"),
+        (MONTH, WEEK, "{} weeks"),
+        (2 * MONTH, 0, "a month"),
+        (YEAR, MONTH, "{} months"),
+        (2 * YEAR, 0, "a year"),
+    ]
+    for limit, unit, text in steps:
+        if seconds < limit:
+            return text.format(max(seconds // unit, 2) if unit else 1) + " ago"
+
+    return f"{seconds // YEAR} years ago"
 
 
 class PipelineTimings(Widget):
@@ -16,10 +58,6 @@ class PipelineTimings(Widget):
         }
     """
 
-    status = reactive("Created", recompose=True, repaint=True)
-    updated_at = reactive("2025-01-01T00:00:00.000+00:00", recompose=True, repaint=True)
-    created_at = reactive("2025-01-01T00:00:00.000+00:00", recompose=True, repaint=True)
-
     def __init__(
         self,
         pipeline: Pipeline,
@@ -29,24 +67,48 @@ class PipelineTimings(Widget):
         disabled: bool = False,
     ) -> None:
         super().__init__(name=name, id=id, classes=classes, disabled=disabled)
+        self.status_label = Label()
+        self.elapsed_label = Label()
+        self.updated_label = Label()
 
-        self.status = pipeline.status
-        self.updated_at = pipeline.updated_at
-        self.created_at = pipeline.created_at
+        self.status: StatusHierarchy | None = None
+        self.elapsed_text = ""
+        self.updated_text = ""
+        self.created_at = 0.0
+        self.updated_at = 0.0
+        self.finished = False
+
+        self.update_pipeline(pipeline)
+
+    def update_pipeline(self, pipeline: Pipeline) -> None:
+        # each label is only handed new text when what it shows changed
+        if pipeline.status != self.status:
+            self.status = pipeline.status
+            self.status_label.update(build_pipeline_pill(pipeline.status))
 
-    def update_pipeline(self, pipeline: Pipeline):
-        self.status = pipeline.status
-        self.updated_at = pipeline.updated_at
         self.created_at = pipeline.created_at
+        self.updated_at = pipeline.updated_at
+        self.finished = is_finished(pipeline.status)
+        self.tick(time.time())
 
-    def compose(self) -> ComposeResult:
-        elapsed = str(arrow.get(self.updated_at) - arrow.get(self.created_at)).split(
-            "."
-        )[0]
+    def tick(self, now: float) -> None:
+        # driven by the app clock, only touches a label when its text changes
+        # a running pipeline's elapsed time keeps going without a new poll
+        finished_at = self.updated_at if self.finished else now
+        elapsed = (
+            f"{Icons.ELAPSED.value} {format_elapsed(finished_at - self.created_at)}"
+        )
+        if elapsed != self.elapsed_text:
+            self.elapsed_text = elapsed
+            self.elapsed_label.update(Text(elapsed))
 
-        yield Label(build_pipeline_pill(self.status.upper()))
-        yield Label(f"{Icons.ELAPSED.value} {elapsed}")
+        updated = f"{Icons.CALENDAR.value} {humanize(now - self.updated_at)}"
+        if updated != self.updated_text:
+            self.updated_text = updated
+            self.updated_label.update(Text(updated))
 
-        date = arrow.get(self.updated_at)
-        display_date = arrow.Arrow.humanize(date)
-        yield Label(f"{Icons.CALENDAR.value} {display_date}")
+    @counted_compose
+    def compose(self) -> ComposeResult:
+        yield self.status_label
+        yield self.elapsed_label
+        yield self.updated_label
@@ -1,8 +1,51 @@
-from dataclasses import dataclass
-from typing import Any
+from dataclasses import dataclass, field
+from datetime import datetime
+from enum import IntEnum, auto
+from typing import Any, Iterator
 
 
-@dataclass
+# allows for > and < assertions :D
+class StatusHierarchy(IntEnum):
+    CREATED = auto()
+    PENDING = auto()
+    RUNNING = auto()
+    SUCCESS = auto()
+    WARNING = auto()
+    FAILED = auto()
+    SKIPPED = auto()
+    MANUAL = auto()
+    CANCELED = auto()
+
+
+# job statuses gitlab has that we don't draw a pill for
+STATUS_ALIASES = {
+    "WAITING_FOR_RESOURCE": "PENDING",
+    "PREPARING": "PENDING",
+    "SCHEDULED": "CREATED",
+    "CANCELING": "RUNNING",
+}
+
+
+def normalize_status(status: str | StatusHierarchy) -> StatusHierarchy:
+    if isinstance(status, StatusHierarchy):
+        return status
+
+    status = status.upper()
+    return StatusHierarchy[STATUS_ALIASES.get(status, status)]
+
+
+def parse_timestamp(value: str | None) -> float | None:
+    if value is None:
+        return None
+
+    # 3.10's fromisoformat does not take the Z suffix gitlab sends
+    if value.endswith("Z"):
+        value = value[:-1] + "+00:00"
+
+    return datetime.fromisoformat(value).timestamp()
+
+
+@dataclass(frozen=True, slots=True)
 class User:
     id: int
     username: str
@@ -30,19 +73,19 @@ class User:
     local_time: str
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class CommitStatus:
     additions: int
     deletions: int
     total: int
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Commit:
     id: str
     short_id: str
     created_at: str
-    parent_ids: list[str]
+    parent_ids: tuple[str, ...]
     title: str
     message: str
     author_name: str
@@ -55,40 +98,131 @@ class Commit:
     extended_trailers: Any
     web_url: str
     stats: CommitStatus
-    status: str
+    status: str | None
     project_id: int
-    last_pipeline: "Pipeline"
+    last_pipeline: "Pipeline | None"
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Job:
     id: int
-    status: str
+    status: StatusHierarchy
     stage: str
     name: str
     ref: str
     tag: bool
     coverage: str
     allow_failure: bool
-    created_at: str
-    started_at: str
-    finished_at: str
+    created_at: float | None
+    started_at: float | None
+    finished_at: float | None
     erased_at: str
     duration: float
     queued_duration: float
+    retried: bool = False
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Pipeline:
     id: int
     iid: int
     project_id: int
     sha: str
     ref: str
-    status: str
+    status: StatusHierarchy
     source: str
-    created_at: str
-    updated_at: str
+    # epoch seconds, parsed once when mapped
+    created_at: float
+    updated_at: float
     web_url: str
     name: str
     is_latest: bool
+
+
+@dataclass(slots=True)
+class Stage:
+    name: str
+    # job ids are handed out in stage order when the pipeline is created
+    first_job_id: int
+    status: StatusHierarchy = StatusHierarchy.CREATED
+    counts: dict[StatusHierarchy, int] = field(default_factory=dict)
+
+
+class PipelineJobs:
+    def __init__(self) -> None:
+        self.by_id: dict[int, Job] = {}
+        self.stages: dict[str, Stage] = {}
+        self.order: list[Stage] = []
+        # lowest retried job id per stage, a retry gets a higher id than its stage
+        self.retried_first_ids: dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.by_id)
+
+    def __iter__(self) -> Iterator[Job]:
+        return iter(self.by_id.values())
+
+    def add(self, job: Job) -> None:
+        if job.retried:
+            # hidden like on gitlab, but its id still says where the stage goes
+            self.remove(job.id)
+
+            first = self.retried_first_ids.get(job.stage)
+            if first is None or job.id < first:
+                self.retried_first_ids[job.stage] = job.id
+                self._sort()
+
+            return
+
+        previous = self.by_id.get(job.id)
+        if previous == job:
+            return
+
+        if previous is not None:
+            self.remove(previous.id)
+
+        self.by_id[job.id] = job
+
+        stage = self.stages.get(job.stage)
+        if stage is None:
+            stage = self.stages[job.stage] = Stage(job.stage, job.id)
+            self.order.append(stage)
+            self._sort()
+        elif job.id < stage.first_job_id:
+            stage.first_job_id = job.id
+            self._sort()
+
+        stage.counts[job.status] = stage.counts.get(job.status, 0) + 1
+        stage.status = max(stage.counts)
+
+    def remove(self, job_id: int) -> None:
+        job = self.by_id.pop(job_id, None)
+        if job is None:
+            return
+
+        stage = self.stages[job.stage]
+
+        stage.counts[job.status] -= 1
+        if stage.counts[job.status] == 0:
+            del stage.counts[job.status]
+
+        if len(stage.counts) == 0:
+            del self.stages[job.stage]
+            self.order.remove(stage)
+            return
+
+        stage.status = max(stage.counts)
+
+        if stage.first_job_id == job_id:
+            stage.first_job_id = min(
+                other.id for other in self.by_id.values() if other.stage == job.stage
+            )
+            self._sort()
+
+    def _sort(self) -> None:
+        self.order.sort(
+            key=lambda stage: min(
+                stage.first_job_id,
+                self.retried_first_ids.get(stage.name, stage.first_job_id),
+            )
+        )
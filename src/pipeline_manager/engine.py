@@ -0,0 +1,291 @@
+import asyncio
+import json
+import time
+from dataclasses import dataclass
+from typing import Any, Mapping, Protocol, TypeAlias
+from urllib.parse import SplitResult, urlsplit
+
+import aiohttp
+
+from .metrics import endpoint_name, metrics
+from .scheduler import Priority, RequestScheduler
+
+RequestKey: TypeAlias = tuple[
+    str, str, tuple[tuple[str, str], ...], tuple[tuple[str, str], ...]
+]
+
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def origin(url: SplitResult) -> tuple[str, str, int | None]:
+    scheme = url.scheme.lower()
+    return scheme, (url.hostname or "").lower(), url.port or DEFAULT_PORTS.get(scheme)
+
+
+class FetchError(Exception):
+    def __init__(self, url: str, status: int, method: str = "GET") -> None:
+        super().__init__(f"{method} {url} failed with HTTP {status}")
+        self.url = url
+        self.status = status
+
+
+# what a single request can fail with, anything that keeps going catches these
+FETCH_ERRORS = (FetchError, aiohttp.ClientError, asyncio.TimeoutError)
+
+
+@dataclass
+class Response:
+    url: str
+    status: int
+    headers: Mapping[str, str]
+    body: bytes
+
+    def json(self) -> Any:
+        return json.loads(self.body)
+
+
+@dataclass
+class SharedRequest:
+    task: asyncio.Future[Response]
+    priority: Priority
+    waiters: int = 0
+
+
+class Transport(Protocol):
+    async def request(
+        self,
+        url: str,
+        params: Mapping[str, Any] | None,
+        headers: Mapping[str, str] | None,
+        priority: Priority,
+        method: str,
+        json_body: Any,
+    ) -> Response: ...
+
+
+class FetchEngine:
+    def __init__(
+        self,
+        base_url: str,
+        token: str,
+        max_concurrency: int,
+        connections_per_host: int,
+        timeout_sec: float = 30,
+        max_retries: int = 3,
+    ) -> None:
+        self.base_url = base_url.rstrip("/")
+        self.api_url = f"{self.base_url}/api/v4"
+        self._base = urlsplit(self.base_url)
+        self.token = token
+        self.max_concurrency = max_concurrency
+        self.connections_per_host = connections_per_host
+        self.timeout_sec = timeout_sec
+        self.max_retries = max_retries
+
+        self.scheduler = RequestScheduler(max_concurrency)
+        self._session: aiohttp.ClientSession | None = None
+        # set while attached to a collector, which then makes the requests for us
+        self.remote: Transport | None = None
+        # identical gets that are already on their way, later callers share them
+        self._in_flight: dict[RequestKey, SharedRequest] = {}
+
+    def is_gitlab(self, url: str) -> bool:
+        # a prefix check would also hand the token to gitlab.example.com.evil
+        target = urlsplit(url)
+        if origin(target) != origin(self._base):
+            return False
+
+        base_path = self._base.path.rstrip("/")
+        return target.path == base_path or target.path.startswith(f"{base_path}/")
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        # created lazily so it is bound to the loop that first uses it
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_concurrency,
+                limit_per_host=self.connections_per_host,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout_sec),
+            )
+
+        return self._session
+
+    async def request(
+        self,
+        url: str,
+        params: Mapping[str, Any] | None = None,
+        headers: Mapping[str, str] | None = None,
+        priority: Priority = Priority.OFFSCREEN_ROW,
+        method: str = "GET",
+        json_body: Any = None,
+    ) -> Response:
+        if method != "GET":
+            return await self._timed_request(
+                url, params, headers, priority, method, json_body
+            )
+
+        key = (
+            method,
+            url,
+            tuple(sorted((k, str(v)) for k, v in (params or {}).items())),
+            tuple(sorted((headers or {}).items())),
+        )
+
+        shared = self._in_flight.get(key)
+        if shared is None:
+            task = asyncio.ensure_future(
+                self._timed_request(
+                    url, params, headers, priority, method, json_body, key
+                )
+            )
+            shared = SharedRequest(task, priority)
+            self._in_flight[key] = shared
+            task.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            metrics.observe_deduplicated(endpoint_name(method, url, self.base_url))
+            if priority < shared.priority:
+                shared.priority = priority
+                self.scheduler.promote(key, priority)
+
+        shared.waiters += 1
+        try:
+            # shielded, one caller being cancelled must not cancel the others
+            return await asyncio.shield(shared.task)
+        except asyncio.CancelledError:
+            # but once the last one gives up nobody wants the answer anymore
+            if shared.waiters == 1:
+                shared.task.cancel()
+                # a caller arriving now must start afresh, not join the cancelled one
+                if self._in_flight.get(key) is shared:
+                    del self._in_flight[key]
+            raise
+        finally:
+            shared.waiters -= 1
+
+    def _forget(self, key: RequestKey, done: asyncio.Future[Response]) -> None:
+        shared = self._in_flight.get(key)
+        if shared is not None and shared.task is done:
+            del self._in_flight[key]
+
+        # every caller may have been cancelled, nobody else would look at it
+        if not done.cancelled():
+            done.exception()
+
+    async def _timed_request(
+        self,
+        url: str,
+        params: Mapping[str, Any] | None,
+        headers: Mapping[str, str] | None,
+        priority: Priority,
+        method: str,
+        json_body: Any,
+        key: RequestKey | None = None,
+    ) -> Response:
+        started = time.perf_counter()
+        failed = True
+        try:
+            response = await self._request(
+                url, params, headers, priority, method, json_body, key
+            )
+            failed = False
+            return response
+        finally:
+            metrics.observe_request(
+                endpoint_name(method, url, self.base_url),
+                time.perf_counter() - started,
+                failed,
+            )
+
+    async def _request(
+        self,
+        url: str,
+        params: Mapping[str, Any] | None,
+        headers: Mapping[str, str] | None,
+        priority: Priority,
+        method: str,
+        json_body: Any,
+        key: RequestKey | None = None,
+    ) -> Response:
+        if self.remote is not None:
+            try:
+                return await self.remote.request(
+                    url, params, headers, priority, method, json_body
+                )
+            except ConnectionError:
+                # the collector went away, carry on by ourselves
+                self.remote = None
+
+        session = self._get_session()
+
+        is_gitlab = self.is_gitlab(url)
+
+        request_headers = dict(headers or {})
+        if is_gitlab:
+            request_headers["PRIVATE-TOKEN"] = self.token
+
+        query = {key: str(value) for key, value in (params or {}).items()}
+
+        for _ in range(self.max_retries + 1):
+            # a caller that joined later may have raised the priority meanwhile
+            shared = self._in_flight.get(key) if key is not None else None
+            if shared is not None:
+                priority = min(priority, shared.priority)
+
+            await self.scheduler.acquire(priority, key)
+            try:
+                async with session.request(
+                    method, url, params=query, headers=request_headers, json=json_body
+                ) as r:
+                    body = await r.read()
+            finally:
+                self.scheduler.release()
+
+            if is_gitlab:
+                self.scheduler.observe(r.status, r.headers)
+
+            if r.status != 429:
+                break
+
+        if r.status >= 400:
+            raise FetchError(url, r.status, method)
+
+        return Response(url, r.status, r.headers, body)
+
+    async def get_api(
+        self,
+        path: str,
+        params: Mapping[str, Any] | None = None,
+        headers: Mapping[str, str] | None = None,
+        priority: Priority = Priority.OFFSCREEN_ROW,
+    ) -> Response:
+        return await self.request(f"{self.api_url}{path}", params, headers, priority)
+
+    async def get_json(
+        self,
+        path: str,
+        params: Mapping[str, Any] | None = None,
+        priority: Priority = Priority.OFFSCREEN_ROW,
+    ) -> Any:
+        return (await self.get_api(path, params, priority=priority)).json()
+
+    async def post_graphql(
+        self,
+        query: str,
+        variables: Mapping[str, Any],
+        priority: Priority = Priority.LIST_POLL,
+    ) -> Any:
+        response = await self.request(
+            f"{self.base_url}/api/graphql",
+            priority=priority,
+            method="POST",
+            json_body={"query": query, "variables": variables},
+        )
+        return response.json()
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
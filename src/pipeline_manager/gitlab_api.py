@@ -1,13 +1,138 @@
+import asyncio
 import os
 import subprocess
+import threading
+import time
+from typing import TYPE_CHECKING, Any, AsyncIterator
 
-import gitlab
-from gitlab.v4.objects import Project
+from .cache import CacheEntry, MemoryCache, disk_cache
+from .data import StatusHierarchy, normalize_status, parse_timestamp
+from .engine import FetchEngine
+from .mappers import intern
+from .metrics import timed
+from .scheduler import Priority
+
+# python-gitlab and requests only load once a project has to be resolved
+if TYPE_CHECKING:
+    import gitlab
+    import requests
+    from gitlab.v4.objects import Project
+
+FINISHED_STATUSES = frozenset(
+    [
+        StatusHierarchy.SUCCESS,
+        StatusHierarchy.FAILED,
+        StatusHierarchy.CANCELED,
+        StatusHierarchy.SKIPPED,
+    ]
+)
+
+# everything mappers.raw_to_pipeline reads, the rest of the payload is dropped
+PIPELINE_FIELDS = (
+    "id",
+    "iid",
+    "project_id",
+    "sha",
+    "ref",
+    "status",
+    "source",
+    "created_at",
+    "updated_at",
+    "web_url",
+    "name",
+)
+
+# everything mappers.raw_commit_to_commit reads
+COMMIT_FIELDS = (
+    "id",
+    "short_id",
+    "created_at",
+    "parent_ids",
+    "title",
+    "message",
+    "author_name",
+    "author_email",
+    "authored_date",
+    "committer_name",
+    "committer_email",
+    "committed_date",
+    "trailers",
+    "extended_trailers",
+    "web_url",
+    "stats",
+    "status",
+    "project_id",
+)
+
+# everything mappers.raw_jobs_to_jobs reads
+JOB_FIELDS = (
+    "id",
+    "status",
+    "stage",
+    "name",
+    "ref",
+    "tag",
+    "coverage",
+    "allow_failure",
+    "created_at",
+    "started_at",
+    "finished_at",
+    "erased_at",
+    "duration",
+    "queued_duration",
+    "retried",
+)
 
 
 class Config:
     GITLAB_URL = os.environ.get("GITLAB_HOST", "")
     GITLAB_TOKEN = os.environ.get("GITLAB_TOKEN", "")
+    BACKEND = os.environ.get("PIPELINE_MANAGER_BACKEND", "rest")
+    # watch these instead of the project the current git checkout points at
+    PROJECTS = [
+        path.strip()
+        for path in os.environ.get("PIPELINE_MANAGER_PROJECTS", "").split(",")
+        if path.strip() != ""
+    ]
+    GROUP = os.environ.get("PIPELINE_MANAGER_GROUP", "")
+    COLLECTOR_SOCKET = os.environ.get("PIPELINE_MANAGER_SOCKET", "")
+
+    # set a port to have gitlab push pipeline and job events instead of polling
+    WEBHOOK_HOST = os.environ.get("PIPELINE_MANAGER_WEBHOOK_HOST", "127.0.0.1")
+    WEBHOOK_PORT = int(os.environ.get("PIPELINE_MANAGER_WEBHOOK_PORT", 0))
+    WEBHOOK_SECRET = os.environ.get("PIPELINE_MANAGER_WEBHOOK_SECRET", "")
+    # mirrors ThreadPoolExecutor's default so every worker can hold a connection
+    WORKERS = int(os.environ.get("GITLAB_WORKERS", min(32, (os.cpu_count() or 1) + 4)))
+    CONNECTIONS_PER_HOST = int(os.environ.get("GITLAB_CONNECTIONS_PER_HOST", 8))
+
+    COMMIT_CACHE_SIZE = 2048
+    USER_CACHE_SIZE = 256
+    JOBS_CACHE_SIZE = 512
+
+    # one ttl for both layers, a disk copy is as stale as the memory one
+    USER_TTL_SEC = 60 * 60
+    # gitlab serves a changed upload from the same path
+    AVATAR_MAX_AGE_SEC = 24 * 60 * 60
+    RUNNING_JOBS_MAX_AGE_SEC = 3
+    JOBS_PAGE_SIZE = 100
+
+    # how far back the list goes, by count and optionally by age
+    HISTORY_DEPTH = int(os.environ.get("PIPELINE_MANAGER_HISTORY_DEPTH", 100))
+    HISTORY_DAYS = float(os.environ.get("PIPELINE_MANAGER_HISTORY_DAYS", 0)) or None
+
+    # append a metrics snapshot as one json line to this file every interval
+    METRICS_FILE = os.environ.get("PIPELINE_MANAGER_METRICS_FILE", "")
+    METRICS_INTERVAL_SEC = float(
+        os.environ.get("PIPELINE_MANAGER_METRICS_INTERVAL_SEC", 10)
+    )
+
+    @classmethod
+    def multi_project(cls) -> bool:
+        return cls.GROUP != "" or len(cls.PROJECTS) > 1
+
+    @classmethod
+    def webhooks(cls) -> bool:
+        return cls.WEBHOOK_PORT != 0
 
     @classmethod
     def valid(cls) -> bool:
@@ -19,6 +144,26 @@ class Config:
         return all(checks)
 
 
+_client_lock = threading.RLock()
+_client: "gitlab.Gitlab | None" = None
+_project: "Project | None" = None
+
+
+commit_cache = MemoryCache(Config.COMMIT_CACHE_SIZE)
+# commit author names are often display names, remember the misses as well
+UNKNOWN_USER: dict[str, Any] = {}
+
+user_cache = MemoryCache(Config.USER_CACHE_SIZE, ttl=Config.USER_TTL_SEC)
+jobs_cache = MemoryCache(Config.JOBS_CACHE_SIZE)
+
+engine = FetchEngine(
+    Config.GITLAB_URL,
+    Config.GITLAB_TOKEN,
+    max_concurrency=Config.WORKERS,
+    connections_per_host=Config.CONNECTIONS_PER_HOST,
+)
+
+
 def get_git_remote_url() -> str | None:
     try:
         result = subprocess.run(
@@ -32,23 +177,574 @@ def get_git_remote_url() -> str | None:
         return None
 
 
-def login() -> gitlab.Gitlab:
-    assert Config.valid()
+def get_project_path(refresh: bool = False) -> str:
+    # a git subprocess per start adds up, the remote of a checkout rarely changes
+    cwd = os.getcwd()
+    entry = disk_cache.get("remotes", cwd)
+    if entry is not None and not refresh:
+        return entry.value
+
+    url = get_git_remote_url() or ""
+    path = "/".join(url.replace(".git", "").split("/")[3::])
+    disk_cache.set("remotes", cwd, path)
 
-    gl = gitlab.Gitlab(url=Config.GITLAB_URL, private_token=Config.GITLAB_TOKEN)
-    gl.auth()
+    return path
 
-    return gl
 
+def build_session() -> "requests.Session":
+    import requests
+    from requests.adapters import HTTPAdapter
 
-def get_current_project() -> Project:
-    url = get_git_remote_url() or ""
-    project = "/".join(url.replace(".git", "").split("/")[3::])
+    adapter = HTTPAdapter(
+        pool_connections=1,
+        pool_maxsize=Config.WORKERS,
+        pool_block=True,
+    )
+
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+
+    return session
+
+
+@timed
+def login() -> "gitlab.Gitlab":
+    import gitlab
+
+    global _client
+
+    if _client is not None:
+        return _client
+
+    with _client_lock:
+        if _client is None:
+            assert Config.valid()
+
+            gl = gitlab.Gitlab(
+                url=Config.GITLAB_URL,
+                private_token=Config.GITLAB_TOKEN,
+                session=build_session(),
+            )
+            gl.auth()
+
+            _client = gl
+
+    return _client
+
+
+@timed
+def get_current_project() -> "Project":
+    global _project
+
+    if _project is not None:
+        return _project
+
+    with _client_lock:
+        if _project is None:
+            _project = login().projects.get(get_project_path())
+
+    return _project
+
+
+@timed
+def get_watched_projects() -> dict[int, str]:
+    if Config.GROUP != "":
+        projects = (
+            login()
+            .groups.get(Config.GROUP)
+            .projects.list(
+                iterator=True, include_subgroups=True, archived=False, simple=True
+            )
+        )
+    elif len(Config.PROJECTS) > 0:
+        projects = [login().projects.get(path) for path in Config.PROJECTS]
+    else:
+        projects = [get_current_project()]
+
+    resolved = {project.id: project.path_with_namespace for project in projects}
+    disk_cache.set("projects", watched_projects_key(), list(resolved.items()))
+
+    return resolved
+
+
+def watched_projects_key() -> str:
+    watched = Config.GROUP or ",".join(Config.PROJECTS) or get_project_path()
+    return f"{Config.GITLAB_URL}|{watched}"
+
+
+def get_cached_watched_projects() -> dict[int, str] | None:
+    entry = disk_cache.get("projects", watched_projects_key())
+    if entry is None:
+        return None
+
+    return {project_id: path for project_id, path in entry.value}
+
+
+def refresh_watched_projects() -> dict[int, str]:
+    get_project_path(refresh=True)
+    return get_watched_projects()
+
+
+@timed
+async def get_pipelines(project_id: int) -> list[dict[str, Any]]:
+    return await engine.get_json(
+        f"/projects/{project_id}/pipelines", priority=Priority.LIST_POLL
+    )
+
+
+@timed
+async def get_pipeline(
+    project_id: int, pipeline_id: int, priority: Priority = Priority.OFFSCREEN_ROW
+) -> dict[str, Any]:
+    return await engine.get_json(
+        f"/projects/{project_id}/pipelines/{pipeline_id}", priority=priority
+    )
+
+
+def is_stale(raw: dict[str, Any], known: dict[str, Any]) -> bool:
+    incoming = parse_timestamp(raw["updated_at"]) or 0
+    current = parse_timestamp(known["updated_at"]) or 0
+
+    if incoming != current:
+        return incoming < current
+
+    # same second, a finished pipeline only goes back to running on a retry
+    return is_finished(known["status"]) and not is_finished(raw["status"])
+
+
+def is_finished(status: str | StatusHierarchy) -> bool:
+    return normalize_status(status) in FINISHED_STATUSES
+
+
+def cache_stats() -> dict[str, dict[str, int]]:
+    return {
+        "commits": commit_cache.stats(),
+        "users": user_cache.stats(),
+        "jobs": jobs_cache.stats(),
+    }
+
+
+def get_cached_commit(sha: str) -> dict[str, Any] | None:
+    raw = commit_cache.get(sha)
+    if raw is not None:
+        return raw
+
+    entry = disk_cache.get("commits", sha)
+    if entry is None:
+        return None
+
+    commit_cache.set(sha, entry.value)
+    return entry.value
+
+
+@timed
+async def get_commit(
+    project_id: int, sha: str, priority: Priority = Priority.OFFSCREEN_ROW
+) -> dict[str, Any]:
+    cached = get_cached_commit(sha)
+    if cached is not None:
+        return cached
+
+    raw = await engine.get_json(
+        f"/projects/{project_id}/repository/commits/{sha}", priority=priority
+    )
+    store_commit(raw)
+
+    return raw
+
+
+def store_commit(raw: dict[str, Any]) -> None:
+    raw = slim_commit(raw)
+    commit_cache.set(raw["id"], raw)
+    disk_cache.set("commits", raw["id"], raw)
+
+
+def get_cached_pipeline_jobs(pipeline_id: int) -> CacheEntry | None:
+    key = str(pipeline_id)
+
+    entry = jobs_cache.get(key)
+    if entry is not None:
+        return entry
+
+    entry = disk_cache.get("jobs", key)
+    if entry is not None:
+        jobs_cache.set(key, entry)
+
+    return entry
+
+
+def jobs_are_fresh(
+    entry: CacheEntry, updated_at: float, status: str | StatusHierarchy
+) -> bool:
+    if entry.meta.get("pipeline_updated_at") != updated_at:
+        return False
+
+    return is_finished(status) or entry.age < Config.RUNNING_JOBS_MAX_AGE_SEC
+
+
+# the caches hold payloads for as long as the models, so they keep only what gets
+# mapped, with the strings that repeat across thousands of them interned
+def slim_pipeline(raw: dict[str, Any]) -> dict[str, Any]:
+    slim = {field: raw.get(field) for field in PIPELINE_FIELDS}
+    for field in ("ref", "status", "source", "name"):
+        slim[field] = intern(slim[field])
 
-    gl = login()
+    return slim
 
-    return gl.projects.get(project)
 
+def slim_commit(raw: dict[str, Any]) -> dict[str, Any]:
+    slim = {field: raw.get(field) for field in COMMIT_FIELDS}
+    for field in ("author_name", "author_email", "committer_name", "committer_email"):
+        slim[field] = intern(slim[field])
+    slim["status"] = intern(slim["status"])
+
+    last_pipeline = raw.get("last_pipeline")
+    slim["last_pipeline"] = (
+        slim_pipeline(last_pipeline) if last_pipeline is not None else None
+    )
+
+    return slim
+
+
+def slim_job(raw: dict[str, Any]) -> dict[str, Any]:
+    slim = {field: raw.get(field) for field in JOB_FIELDS}
+    for field in ("status", "stage", "name", "ref"):
+        slim[field] = intern(slim[field])
+
+    return slim
+
+
+async def iter_pages(
+    path: str,
+    params: dict[str, Any] | None = None,
+    priority: Priority = Priority.OFFSCREEN_ROW,
+) -> AsyncIterator[list[dict[str, Any]]]:
+    query = {"page": 1, **(params or {})}
+
+    while True:
+        response = await engine.get_api(path, query, priority=priority)
+        yield response.json()
+
+        next_page = response.headers.get("X-Next-Page")
+        if not next_page:
+            return
+
+        query["page"] = next_page
+
+
+@timed
+async def stream_pipeline_jobs(
+    project_id: int,
+    pipeline_id: int,
+    updated_at: float,
+    status: str | StatusHierarchy,
+    priority: Priority = Priority.OFFSCREEN_ROW,
+) -> AsyncIterator[list[dict[str, Any]]]:
+    cached = get_cached_pipeline_jobs(pipeline_id)
+    if cached is not None and jobs_are_fresh(cached, updated_at, status):
+        yield cached.value
+        return
+
+    raw: list[dict[str, Any]] = []
+
+    # bridges are the trigger jobs for downstream pipelines, /jobs leaves them out.
+    # retried jobs only come along to place their stage, see PipelineJobs.add
+    queries = [
+        ("jobs", {"per_page": Config.JOBS_PAGE_SIZE, "include_retried": "true"}),
+        ("bridges", {"per_page": Config.JOBS_PAGE_SIZE}),
+    ]
+    for kind, query in queries:
+        async for page in iter_pages(
+            f"/projects/{project_id}/pipelines/{pipeline_id}/{kind}",
+            query,
+            priority,
+        ):
+            jobs = [slim_job(job) for job in page]
+            raw.extend(jobs)
+
+            yield jobs
+
+    store_pipeline_jobs(pipeline_id, raw, updated_at, status)
+
+
+def store_pipeline_jobs(
+    pipeline_id: int,
+    raw: list[dict[str, Any]],
+    updated_at: float,
+    status: str | StatusHierarchy,
+) -> None:
+    meta = {
+        "pipeline_updated_at": updated_at,
+        "pipeline_status": normalize_status(status).name.lower(),
+    }
+    jobs_cache.set(str(pipeline_id), CacheEntry(raw, time.time(), meta))
+    disk_cache.set("jobs", str(pipeline_id), raw, **meta)
+
+
+def store_pipeline_job(pipeline_id: int, raw_job: dict[str, Any]) -> None:
+    cached = get_cached_pipeline_jobs(pipeline_id)
+    if cached is None:
+        return
+
+    raw = [job for job in cached.value if job["id"] != raw_job["id"]]
+    raw.append(raw_job)
+
+    store_pipeline_jobs(
+        pipeline_id,
+        raw,
+        cached.meta["pipeline_updated_at"],
+        cached.meta["pipeline_status"],
+    )
+
+
+def get_cached_user(username: str) -> dict[str, Any] | None:
+    # UNKNOWN_USER when gitlab had nobody by that name, None when we never asked
+    raw = user_cache.get(username)
+    if raw is not None:
+        return raw
+
+    entry = disk_cache.get("users", f"{Config.GITLAB_URL}/{username}")
+    if entry is None or entry.age >= Config.USER_TTL_SEC:
+        return None
+
+    # only for what is left of its ttl, or it would never be refetched
+    raw = entry.value if entry.value is not None else UNKNOWN_USER
+    user_cache.set(username, raw, ttl=Config.USER_TTL_SEC - entry.age)
+
+    return raw
+
+
+@timed
+async def get_user(username: str) -> dict[str, Any] | None:
+    cached = get_cached_user(username)
+    if cached is not None:
+        return cached
+
+    users = await engine.get_json(
+        "/users", {"username": username}, priority=Priority.AVATAR
+    )
+    raw = users[0] if len(users) > 0 else None
+    store_user(username, raw)
+
+    return raw if raw is not None else UNKNOWN_USER
+
+
+def store_user(username: str, raw: dict[str, Any] | None) -> None:
+    user_cache.set(username, raw if raw is not None else UNKNOWN_USER)
+    disk_cache.set("users", f"{Config.GITLAB_URL}/{username}", raw)
+
+
+@timed
+async def get_avatar(url: str) -> bytes:
+    cached = disk_cache.get("avatars", url)
+    if cached is not None and cached.age < Config.AVATAR_MAX_AGE_SEC:
+        return cached.value
+
+    data = (await engine.request(url, priority=Priority.AVATAR)).body
+    disk_cache.set("avatars", url, data)
+
+    return data
+
+
+class PipelinePoller:
+    PAGE_SIZE = 20
+    FULL_SYNC_EVERY = 20
+
+    def __init__(
+        self,
+        project_id: int,
+        depth: int = Config.HISTORY_DEPTH,
+        days: float | None = Config.HISTORY_DAYS,
+    ) -> None:
+        self.project_id = project_id
+        self.depth = max(depth, self.PAGE_SIZE)
+        self.days = days
+        self.etag: str | None = None
+        self.newest_updated_at: str | None = None
+        self.polls_since_full_sync = 0
+        self.raw_pipelines: dict[int, dict[str, Any]] = {}
+
+        cached = disk_cache.get("pipelines", str(project_id))
+        if cached is not None:
+            self.raw_pipelines = {raw["id"]: slim_pipeline(raw) for raw in cached.value}
+
+    def history_query(self) -> dict[str, Any]:
+        query: dict[str, Any] = {"per_page": self.PAGE_SIZE}
+
+        if self.days is not None:
+            cutoff = time.time() - self.days * 24 * 60 * 60
+            query["updated_after"] = time.strftime(
+                "%Y-%m-%dT%H:%M:%SZ", time.gmtime(cutoff)
+            )
+
+        return query
+
+    async def _request(self, query: dict[str, Any]) -> list[dict[str, Any]] | None:
+        headers = {"If-None-Match": self.etag} if self.etag is not None else None
+        path = f"/projects/{self.project_id}/pipelines"
+
+        response = await engine.get_api(
+            path, query, headers, priority=Priority.LIST_POLL
+        )
+        if response.status == 304:
+            return None
+
+        self.etag = response.headers.get("ETag")
+        pipelines = response.json()
+
+        # an updated_after poll has to see everything that changed, after a long
+        # backoff that is more than the newest page
+        next_page = response.headers.get("X-Next-Page")
+        if "updated_after" in query and next_page:
+            # the first page's tag says nothing about the pages after it
+            self.etag = None
+            async for page in iter_pages(
+                path, {**query, "page": next_page}, Priority.LIST_POLL
+            ):
+                pipelines.extend(page)
+
+        return pipelines
+
+    def _request_history(
+        self, query: dict[str, Any]
+    ) -> AsyncIterator[list[dict[str, Any]]]:
+        # the head page is what poll() keeps fresh, history starts after it
+        return iter_pages(
+            f"/projects/{self.project_id}/pipelines",
+            {**query, "page": 2},
+            Priority.OFFSCREEN_ROW,
+        )
+
+    def needs_full_sync(self) -> bool:
+        return (
+            self.newest_updated_at is None
+            or self.polls_since_full_sync >= self.FULL_SYNC_EVERY
+        )
+
+    @timed
+    async def poll(self) -> bool:
+        full_sync = self.needs_full_sync()
+
+        query: dict[str, Any] = {"per_page": self.PAGE_SIZE}
+        if not full_sync:
+            query["updated_after"] = self.newest_updated_at
+
+        return self.apply(await self._request(query), full_sync)
+
+    def apply(self, changed: list[dict[str, Any]] | None, full_sync: bool) -> bool:
+        self.polls_since_full_sync = 0 if full_sync else self.polls_since_full_sync + 1
+
+        if changed is None:
+            return False
+
+        removed = False
+        if full_sync:
+            # anything in the head page's range that it no longer lists is gone
+            oldest = min((raw["id"] for raw in changed), default=0)
+            returned = {raw["id"] for raw in changed}
+            kept = {
+                key: raw
+                for key, raw in self.raw_pipelines.items()
+                if key < oldest or key in returned
+            }
+            removed = len(kept) != len(self.raw_pipelines)
+            self.raw_pipelines = kept
+
+        updated: list[int] = []
+        for raw in map(slim_pipeline, changed):
+            # updated_after is inclusive, the newest pipeline comes back every poll
+            if self.raw_pipelines.get(raw["id"]) != raw:
+                self.raw_pipelines[raw["id"]] = raw
+                updated.append(raw["id"])
+
+            if (
+                self.newest_updated_at is None
+                or raw["updated_at"] > self.newest_updated_at
+            ):
+                self.newest_updated_at = raw["updated_at"]
+
+        if removed or len(updated) > 0:
+            self._trim()
+
+        # changes past the history depth come back as well, and are trimmed again
+        return removed or any(key in self.raw_pipelines for key in updated)
+
+    async def iter_history(self) -> AsyncIterator[list[dict[str, Any]]]:
+        async for page in self._request_history(self.history_query()):
+            for raw in map(slim_pipeline, page):
+                known = self.raw_pipelines.get(raw["id"])
+                if known is None or raw["updated_at"] >= known["updated_at"]:
+                    self.raw_pipelines[raw["id"]] = raw
+
+            self._trim()
+            yield page
+
+            if len(self.raw_pipelines) >= self.depth:
+                return
+
+    def push(self, raw: dict[str, Any]) -> dict[str, Any] | None:
+        if raw["project_id"] != self.project_id:
+            return None
+
+        known = self.raw_pipelines.get(raw["id"])
+        if known is not None:
+            # hooks arrive in any order, a late one must not undo a newer state
+            if is_stale(raw, known):
+                return None
+
+            updated_at = known["updated_at"]
+            if raw["status"] != known["status"]:
+                updated_at = max(
+                    updated_at,
+                    raw["updated_at"],
+                    key=lambda value: parse_timestamp(value) or 0,
+                )
+
+            raw = {**known, **raw, "updated_at": updated_at}
+
+        raw = slim_pipeline(raw)
+        # leave newest_updated_at alone so the next poll still picks up the
+        # server's own copy
+        self.raw_pipelines[raw["id"]] = raw
+
+        self._trim()
+        return raw if raw["id"] in self.raw_pipelines else None
+
+    def _trim(self) -> None:
+        newest_first = sorted(self.raw_pipelines, reverse=True)[: self.depth]
+        self.raw_pipelines = {key: self.raw_pipelines[key] for key in newest_first}
+
+        disk_cache.set("pipelines", str(self.project_id), self.get_pipelines())
+
+    def get_pipelines(self) -> list[dict[str, Any]]:
+        return list(self.raw_pipelines.values())
+
+
+# one process watching many projects, every child shares the engine and caches
+class MultiProjectPoller:
+    def __init__(self, pollers: list[PipelinePoller]) -> None:
+        self.pollers = pollers
+
+    @timed
+    async def poll(self) -> bool:
+        changed = await asyncio.gather(*(poller.poll() for poller in self.pollers))
+        return any(changed)
+
+    def push(self, raw: dict[str, Any]) -> dict[str, Any] | None:
+        for poller in self.pollers:
+            pushed = poller.push(raw)
+            if pushed is not None:
+                return pushed
+
+        return None
+
+    async def iter_history(self) -> AsyncIterator[list[dict[str, Any]]]:
+        for poller in self.pollers:
+            async for page in poller.iter_history():
+                yield page
 
-def get_pipelines(project: Project):
-    return project.pipelines.list()
+    def get_pipelines(self) -> list[dict[str, Any]]:
+        # pipeline ids are unique across the instance, so they sort globally
+        pipelines = [raw for poller in self.pollers for raw in poller.get_pipelines()]
+        return sorted(pipelines, key=lambda raw: raw["id"], reverse=True)
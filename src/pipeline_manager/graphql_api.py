@@ -0,0 +1,384 @@
+import asyncio
+from typing import Any, AsyncIterator
+
+from .data import parse_timestamp
+from .gitlab_api import (
+    Config,
+    MultiProjectPoller,
+    PipelinePoller,
+    engine,
+    slim_job,
+    store_commit,
+    store_pipeline_jobs,
+    store_user,
+)
+from .metrics import timed
+from .scheduler import Priority
+
+# GraphQL caps connections at 100 nodes per page
+MAX_PAGE_SIZE = 100
+
+# GitLab caps how many paths one projects(fullPaths:) lookup takes
+MAX_PROJECTS_PER_QUERY = 50
+PROJECTS_PER_QUERY = 10
+
+PIPELINE_FIELDS = """
+fragment PipelineFields on Pipeline {
+  id
+  iid
+  sha
+  ref
+  status
+  source
+  name
+  createdAt
+  updatedAt
+  path
+  commit {
+    sha
+    shortId
+    title
+    message
+    authorName
+    authorEmail
+    authoredDate
+    committerName
+    committerEmail
+    committedDate
+    webUrl
+    author { username avatarUrl }
+  }
+  jobs {
+    pageInfo { hasNextPage }
+    nodes {
+      id
+      name
+      status
+      stage { name }
+      refName
+      allowFailure
+      coverage
+      createdAt
+      startedAt
+      finishedAt
+      duration
+      queuedDuration
+      retried
+    }
+  }
+}
+"""
+
+PIPELINES_QUERY = """
+query($fullPath: ID!, $first: Int!, $after: String, $updatedAfter: Time) {
+  project(fullPath: $fullPath) {
+    pipelines(first: $first, after: $after, updatedAfter: $updatedAfter) {
+      pageInfo { hasNextPage endCursor }
+      nodes { ...PipelineFields }
+    }
+  }
+}
+""" + PIPELINE_FIELDS
+
+PROJECTS_QUERY = """
+query($fullPaths: [String!], $first: Int!, $updatedAfter: Time) {
+  projects(fullPaths: $fullPaths, first: %d) {
+    nodes {
+      fullPath
+      pipelines(first: $first, updatedAfter: $updatedAfter) {
+        pageInfo { hasNextPage endCursor }
+        nodes { ...PipelineFields }
+      }
+    }
+  }
+}
+""" % MAX_PROJECTS_PER_QUERY + PIPELINE_FIELDS
+
+
+class GraphQLError(Exception):
+    pass
+
+
+def parse_gid(gid: str) -> int:
+    # global ids look like gid://gitlab/Ci::Pipeline/123
+    return int(gid.rsplit("/", 1)[-1])
+
+
+def absolute_url(path: str | None) -> str | None:
+    if path is None or not path.startswith("/"):
+        return path
+
+    return f"{Config.GITLAB_URL.rstrip('/')}{path}"
+
+
+def graphql_pipeline_to_raw(node: dict[str, Any], project_id: int) -> dict[str, Any]:
+    return {
+        "id": parse_gid(node["id"]),
+        "iid": int(node["iid"]),
+        "project_id": project_id,
+        "sha": node["sha"],
+        "ref": node["ref"],
+        "status": node["status"].lower(),
+        "source": node["source"],
+        "created_at": node["createdAt"],
+        "updated_at": node["updatedAt"],
+        "web_url": absolute_url(node["path"]),
+        "name": node.get("name"),
+    }
+
+
+def graphql_commit_to_raw(
+    commit: dict[str, Any], pipeline: dict[str, Any]
+) -> dict[str, Any]:
+    last_pipeline = {key: value for key, value in pipeline.items() if key != "name"}
+
+    return {
+        "id": commit["sha"],
+        "short_id": commit["shortId"],
+        "created_at": commit["committedDate"],
+        "parent_ids": [],
+        "title": commit["title"],
+        "message": commit["message"],
+        "author_name": commit["authorName"],
+        "author_email": commit["authorEmail"],
+        "authored_date": commit["authoredDate"],
+        "committer_name": commit["committerName"],
+        "committer_email": commit["committerEmail"],
+        "committed_date": commit["committedDate"],
+        "trailers": {},
+        "extended_trailers": {},
+        "web_url": commit["webUrl"],
+        "stats": {},
+        "status": pipeline["status"],
+        "project_id": pipeline["project_id"],
+        "last_pipeline": last_pipeline,
+    }
+
+
+def graphql_job_to_raw(job: dict[str, Any]) -> dict[str, Any]:
+    return {
+        "id": parse_gid(job["id"]),
+        "status": job["status"].lower(),
+        "stage": job["stage"]["name"] if job["stage"] is not None else "",
+        "name": job["name"],
+        "ref": job["refName"],
+        "tag": False,
+        "coverage": job["coverage"],
+        "allow_failure": job["allowFailure"],
+        "created_at": job["createdAt"],
+        "started_at": job["startedAt"],
+        "finished_at": job["finishedAt"],
+        "erased_at": None,
+        "duration": job["duration"],
+        "queued_duration": job["queuedDuration"],
+        "retried": job["retried"],
+    }
+
+
+def store_graphql_pipeline(node: dict[str, Any], pipeline: dict[str, Any]) -> None:
+    commit = node.get("commit")
+    if commit is not None:
+        store_commit(graphql_commit_to_raw(commit, pipeline))
+
+        author = commit.get("author")
+        if author is not None:
+            store_user(
+                commit["authorName"],
+                {
+                    "username": author["username"],
+                    "avatar_url": absolute_url(author["avatarUrl"]),
+                },
+            )
+
+    # leave pipelines with more jobs than one page to the streamed REST loader
+    if node["jobs"]["pageInfo"]["hasNextPage"]:
+        return
+
+    jobs = [slim_job(graphql_job_to_raw(job)) for job in node["jobs"]["nodes"]]
+    store_pipeline_jobs(
+        pipeline["id"],
+        jobs,
+        parse_timestamp(pipeline["updated_at"]),
+        pipeline["status"],
+    )
+
+
+def check_result(result: dict[str, Any]) -> dict[str, Any]:
+    if result.get("errors"):
+        raise GraphQLError(result["errors"][0].get("message", "GraphQL query failed"))
+
+    return result
+
+
+async def get_projects_head_pages(
+    full_paths: list[str], first: int, updated_after: str | None = None
+) -> dict[str, dict[str, Any]]:
+    variables = {
+        "fullPaths": full_paths,
+        "first": first,
+        "updatedAfter": updated_after,
+    }
+    result = check_result(
+        await engine.post_graphql(PROJECTS_QUERY, variables, Priority.LIST_POLL)
+    )
+
+    return {
+        project["fullPath"]: project["pipelines"]
+        for project in result["data"]["projects"]["nodes"]
+    }
+
+
+async def get_pipeline_page(
+    full_path: str,
+    first: int,
+    after: str | None = None,
+    updated_after: str | None = None,
+    priority: Priority = Priority.LIST_POLL,
+) -> dict[str, Any]:
+    variables = {
+        "fullPath": full_path,
+        "first": first,
+        "after": after,
+        "updatedAfter": updated_after,
+    }
+    result = check_result(
+        await engine.post_graphql(PIPELINES_QUERY, variables, priority)
+    )
+
+    project = result["data"]["project"]
+    if project is None:
+        raise GraphQLError(f"Project {full_path} not found")
+
+    return project["pipelines"]
+
+
+class GraphQLPipelinePoller(PipelinePoller):
+    def __init__(self, project_id: int, full_path: str, **kwargs: Any) -> None:
+        super().__init__(project_id, **kwargs)
+        self.full_path = full_path
+        # where the head page ended on the last full sync, history picks up there
+        self.head_cursor: str | None = None
+
+    async def _request(self, query: dict[str, Any]) -> list[dict[str, Any]] | None:
+        wanted = query["per_page"]
+        updated_after = query.get("updated_after")
+        if updated_after is not None:
+            page = await get_pipeline_page(
+                self.full_path, min(wanted, MAX_PAGE_SIZE), None, updated_after
+            )
+            return self.store_page(page) + await self.changed_after(page, updated_after)
+
+        after: str | None = None
+        pipelines: list[dict[str, Any]] = []
+
+        while len(pipelines) < wanted:
+            page = await get_pipeline_page(
+                self.full_path, min(wanted - len(pipelines), MAX_PAGE_SIZE), after
+            )
+            pipelines.extend(self.store_page(page))
+
+            if not page["pageInfo"]["hasNextPage"]:
+                after = None
+                break
+
+            after = page["pageInfo"]["endCursor"]
+
+        self.head_cursor = after
+        return pipelines
+
+    async def changed_after(
+        self, page: dict[str, Any], updated_after: str
+    ) -> list[dict[str, Any]]:
+        # an updatedAfter poll has to see everything that changed, after a long
+        # backoff that is more than the newest page
+        pipelines: list[dict[str, Any]] = []
+
+        while page["pageInfo"]["hasNextPage"]:
+            page = await get_pipeline_page(
+                self.full_path,
+                min(self.PAGE_SIZE, MAX_PAGE_SIZE),
+                page["pageInfo"]["endCursor"],
+                updated_after,
+            )
+            pipelines.extend(self.store_page(page))
+
+        return pipelines
+
+    async def _request_history(
+        self, query: dict[str, Any]
+    ) -> AsyncIterator[list[dict[str, Any]]]:
+        after = self.head_cursor
+
+        while after is not None:
+            page = await get_pipeline_page(
+                self.full_path,
+                min(query["per_page"], MAX_PAGE_SIZE),
+                after,
+                query.get("updated_after"),
+                Priority.OFFSCREEN_ROW,
+            )
+            yield self.store_page(page)
+
+            after = page["pageInfo"]["endCursor"]
+            if not page["pageInfo"]["hasNextPage"]:
+                return
+
+    def store_page(self, page: dict[str, Any]) -> list[dict[str, Any]]:
+        pipelines = []
+
+        for node in page["nodes"]:
+            pipeline = graphql_pipeline_to_raw(node, self.project_id)
+            store_graphql_pipeline(node, pipeline)
+            pipelines.append(pipeline)
+
+        return pipelines
+
+
+class GraphQLMultiProjectPoller(MultiProjectPoller):
+    pollers: list[GraphQLPipelinePoller]
+
+    @timed
+    async def poll(self) -> bool:
+        # every project shares the cycle, so the oldest cursor covers them all
+        full_sync = any(poller.needs_full_sync() for poller in self.pollers)
+        updated_after = None
+        if not full_sync:
+            updated_after = min(
+                poller.newest_updated_at
+                for poller in self.pollers
+                if poller.newest_updated_at is not None
+            )
+
+        first = min(GraphQLPipelinePoller.PAGE_SIZE, MAX_PAGE_SIZE)
+        batches = [
+            self.pollers[start : start + PROJECTS_PER_QUERY]
+            for start in range(0, len(self.pollers), PROJECTS_PER_QUERY)
+        ]
+        pages = await asyncio.gather(
+            *(
+                get_projects_head_pages(
+                    [poller.full_path for poller in batch], first, updated_after
+                )
+                for batch in batches
+            )
+        )
+
+        changed = False
+        for batch, by_path in zip(batches, pages):
+            for poller in batch:
+                page = by_path.get(poller.full_path)
+                if page is None:
+                    continue
+
+                pipelines = poller.store_page(page)
+                if full_sync:
+                    has_next = page["pageInfo"]["hasNextPage"]
+                    poller.head_cursor = (
+                        page["pageInfo"]["endCursor"] if has_next else None
+                    )
+                elif updated_after is not None:
+                    pipelines += await poller.changed_after(page, updated_after)
+
+                changed |= poller.apply(pipelines, full_sync)
+
+        return changed
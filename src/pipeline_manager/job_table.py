@@ -0,0 +1,86 @@
+from dataclasses import dataclass
+from typing import Mapping
+
+import numpy as np
+
+from .data import PipelineJobs, StatusHierarchy
+
+
+# one row per job across many pipelines, for aggregating without walking objects
+@dataclass(frozen=True, slots=True)
+class JobTable:
+    pipeline_ids: np.ndarray
+    job_ids: np.ndarray
+    statuses: np.ndarray
+    stages: np.ndarray
+    durations: np.ndarray
+    stage_names: tuple[str, ...]
+
+    @classmethod
+    def from_pipelines(cls, jobs_by_pipeline: Mapping[int, PipelineJobs]) -> "JobTable":
+        size = sum(len(jobs) for jobs in jobs_by_pipeline.values())
+
+        pipeline_ids = np.empty(size, dtype=np.int64)
+        job_ids = np.empty(size, dtype=np.int64)
+        statuses = np.empty(size, dtype=np.uint8)
+        stages = np.empty(size, dtype=np.uint16)
+        durations = np.empty(size, dtype=np.float32)
+        stage_codes: dict[str, int] = {}
+
+        row = 0
+        for pipeline_id, jobs in jobs_by_pipeline.items():
+            for job in jobs:
+                pipeline_ids[row] = pipeline_id
+                job_ids[row] = job.id
+                statuses[row] = job.status
+                stages[row] = stage_codes.setdefault(job.stage, len(stage_codes))
+                durations[row] = job.duration if job.duration is not None else np.nan
+                row += 1
+
+        return cls(
+            pipeline_ids,
+            job_ids,
+            statuses,
+            stages,
+            durations,
+            tuple(stage_codes),
+        )
+
+    def __len__(self) -> int:
+        return len(self.job_ids)
+
+    @property
+    def nbytes(self) -> int:
+        columns = [
+            self.pipeline_ids,
+            self.job_ids,
+            self.statuses,
+            self.stages,
+            self.durations,
+        ]
+        return sum(column.nbytes for column in columns)
+
+    def status_counts(self) -> dict[StatusHierarchy, int]:
+        counts = np.bincount(self.statuses, minlength=len(StatusHierarchy) + 1)
+        return {status: int(counts[status]) for status in StatusHierarchy}
+
+    def worst_status_by_pipeline(self) -> dict[int, StatusHierarchy]:
+        pipeline_ids, rows = np.unique(self.pipeline_ids, return_inverse=True)
+
+        worst = np.zeros(len(pipeline_ids), dtype=np.uint8)
+        np.maximum.at(worst, rows, self.statuses)
+
+        return {
+            int(pipeline_id): StatusHierarchy(status)
+            for pipeline_id, status in zip(pipeline_ids, worst)
+        }
+
+    def duration_by_stage(self) -> dict[str, float]:
+        known = ~np.isnan(self.durations)
+        totals = np.bincount(
+            self.stages[known],
+            weights=self.durations[known],
+            minlength=len(self.stage_names),
+        )
+
+        return {name: float(total) for name, total in zip(self.stage_names, totals)}
@@ -1,34 +1,66 @@
-from typing import Any, List, TypeAlias
+import sys
+from typing import TYPE_CHECKING, Any, List, TypeAlias
+
+from .data import (
+    Commit,
+    CommitStatus,
+    Job,
+    Pipeline,
+    PipelineJobs,
+    normalize_status,
+    parse_timestamp,
+)
+
+# python-gitlab is slow to import and only needed once a RESTObject shows up
+if TYPE_CHECKING:
+    from gitlab.base import RESTObject, RESTObjectList
+
+RawObject: TypeAlias = "RESTObject | dict[str, Any]"
+Pipelines: TypeAlias = "RESTObjectList | List[RawObject]"
+
+
+def as_raw(obj: RawObject) -> dict[str, Any]:
+    if isinstance(obj, dict):
+        return obj
+
+    return obj.asdict()
+
+
+# refs, stages, job and author names repeat across thousands of objects
+def intern(value: str | None) -> str | None:
+    return sys.intern(value) if value is not None else None
+
+
+def raw_to_pipeline(p: dict[str, Any], is_latest: bool) -> Pipeline:
+    return Pipeline(
+        id=p["id"],
+        iid=p["iid"],
+        project_id=p["project_id"],
+        sha=p["sha"],
+        ref=intern(p["ref"]),
+        status=normalize_status(p["status"]),
+        source=intern(p["source"]),
+        created_at=parse_timestamp(p["created_at"]),
+        updated_at=parse_timestamp(p["updated_at"]),
+        web_url=p["web_url"],
+        name=intern(p.get("name")),
+        is_latest=is_latest,
+    )
 
-from gitlab.base import RESTObject, RESTObjectList
-from gitlab.v4.objects import ProjectCommit
 
-from .data import Commit, CommitStatus, Job, Pipeline
+def raw_pipeline_to_pipeline(pipelines: Pipelines) -> list[Pipeline]:
+    wrapped_pipelines = []
+    latest_commit_per_branch: dict[tuple[int, str], str] = {}
 
-Pipelines: TypeAlias = RESTObjectList | List[RESTObject]
+    for raw in pipelines:
+        p = as_raw(raw)
+        branch = (p["project_id"], p["ref"])
 
+        if latest_commit_per_branch.get(branch) is None:
+            latest_commit_per_branch[branch] = p["sha"]
 
-def raw_pipeline_to_pipeline(pipelines: Pipelines) -> list[Pipeline]:
-    wrapped_pipelines = []
-    latest_commit_per_branch: dict[str, str | None] = {}
-
-    for p in pipelines:
-        if latest_commit_per_branch.get(p.ref) is None:
-            latest_commit_per_branch[p.ref] = p.sha
-
-        new_pipeline = Pipeline(
-            id=p.id,
-            iid=p.iid,
-            project_id=p.project_id,
-            sha=p.sha,
-            ref=p.ref,
-            status=p.status,
-            source=p.source,
-            created_at=p.created_at,
-            updated_at=p.updated_at,
-            web_url=p.web_url,
-            name=p.name,
-            is_latest=p.sha == latest_commit_per_branch.get(p.ref),
+        new_pipeline = raw_to_pipeline(
+            p, is_latest=p["sha"] == latest_commit_per_branch.get(branch)
         )
 
         wrapped_pipelines.append(new_pipeline)
@@ -36,26 +68,32 @@ def raw_pipeline_to_pipeline(pipelines: Pipelines) -> list[Pipeline]:
     return wrapped_pipelines
 
 
-def raw_jobs_to_jobs(jobs: List[RESTObject] | RESTObjectList) -> list[Job]:
-    mapped_jobs = []
+def raw_jobs_to_jobs(
+    jobs: "List[RawObject] | RESTObjectList", into: PipelineJobs | None = None
+) -> PipelineJobs:
+    # passing the jobs of a previous load only touches the stages that changed
+    mapped_jobs = into if into is not None else PipelineJobs()
+
+    for raw in jobs:
+        job = as_raw(raw)
 
-    for job in jobs:
-        mapped_jobs.append(
+        mapped_jobs.add(
             Job(
-                job.id,
-                job.status,
-                stage=job.stage,
-                name=job.name,
-                ref=job.ref,
-                tag=job.tag,
-                coverage=job.coverage,
-                allow_failure=job.allow_failure,
-                created_at=job.created_at,
-                started_at=job.started_at,
-                finished_at=job.finished_at,
-                erased_at=job.erased_at,
-                duration=job.duration,
-                queued_duration=job.queued_duration,
+                job["id"],
+                normalize_status(job["status"]),
+                stage=intern(job["stage"]),
+                name=intern(job["name"]),
+                ref=intern(job["ref"]),
+                tag=job["tag"],
+                coverage=job["coverage"],
+                allow_failure=job["allow_failure"],
+                created_at=parse_timestamp(job["created_at"]),
+                started_at=parse_timestamp(job["started_at"]),
+                finished_at=parse_timestamp(job["finished_at"]),
+                erased_at=job["erased_at"],
+                duration=job["duration"],
+                queued_duration=job["queued_duration"],
+                retried=bool(job.get("retried")),
             )
         )
 
@@ -70,26 +108,32 @@ def raw_status_to_commit_status(status: Any) -> CommitStatus:
     )
 
 
-def raw_commit_to_commit(raw_commit: ProjectCommit) -> Commit:
+def raw_commit_to_commit(commit: RawObject) -> Commit:
+    raw_commit = as_raw(commit)
+    last_pipeline = raw_commit.get("last_pipeline")
+
     return Commit(
-        id=raw_commit.id,
-        short_id=raw_commit.short_id,
-        created_at=raw_commit.created_at,
-        parent_ids=raw_commit.parent_ids,
-        title=raw_commit.title,
-        message=raw_commit.message,
-        author_name=raw_commit.author_name,
-        author_email=raw_commit.author_email,
-        authored_date=raw_commit.authored_date,
-        committer_name=raw_commit.committer_name,
-        committer_email=raw_commit.committer_email,
-        committed_date=raw_commit.committed_date,
-        trailers=raw_commit.trailers,
-        extended_trailers=raw_commit.extended_trailers,
-        web_url=raw_commit.web_url,
-        stats=raw_status_to_commit_status(raw_commit.stats),
-        status=raw_commit.status,
-        project_id=raw_commit.project_id,
-        # last_pipeline=raw_pipeline_to_pipeline([raw_commit.last_pipeline])[0],
-        last_pipeline=Pipeline(**raw_commit.last_pipeline, name="", is_latest=False),
+        id=raw_commit["id"],
+        short_id=raw_commit["short_id"],
+        created_at=raw_commit["created_at"],
+        parent_ids=tuple(raw_commit["parent_ids"]),
+        title=raw_commit["title"],
+        message=raw_commit["message"],
+        author_name=intern(raw_commit["author_name"]),
+        author_email=intern(raw_commit["author_email"]),
+        authored_date=raw_commit["authored_date"],
+        committer_name=intern(raw_commit["committer_name"]),
+        committer_email=intern(raw_commit["committer_email"]),
+        committed_date=raw_commit["committed_date"],
+        trailers=raw_commit["trailers"],
+        extended_trailers=raw_commit["extended_trailers"],
+        web_url=raw_commit["web_url"],
+        stats=raw_status_to_commit_status(raw_commit["stats"]),
+        status=intern(raw_commit["status"]),
+        project_id=raw_commit["project_id"],
+        last_pipeline=(
+            raw_to_pipeline(last_pipeline, is_latest=False)
+            if last_pipeline is not None
+            else None
+        ),
     )
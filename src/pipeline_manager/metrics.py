@@ -0,0 +1,204 @@
+import functools
+import inspect
+import json
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from typing import Any, Callable, TypeVar
+from urllib.parse import urlsplit
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+# ids, shas and url-encoded project paths would give every request its own row
+_ID_SEGMENT = re.compile(r"/(\d+|[0-9a-f]{40}|[^/]*%2F[^/]*)(?=/|$)")
+
+
+class Histogram:
+    __slots__ = ("buckets", "count", "total_ms", "max_ms")
+
+    def __init__(self) -> None:
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, ms: float) -> None:
+        index = 0
+        while index < len(LATENCY_BUCKETS_MS) and ms > LATENCY_BUCKETS_MS[index]:
+            index += 1
+
+        self.buckets[index] += 1
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def percentile(self, q: float) -> float:
+        # upper bound of the bucket holding the q-th observation
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS_MS, self.buckets):
+            seen += count
+            if seen >= rank:
+                return round(min(bound, self.max_ms), 2)
+
+        return round(self.max_ms, 2)
+
+    def to_dict(self) -> dict[str, Any]:
+        labels = [f"le_{bound}" for bound in LATENCY_BUCKETS_MS] + ["inf"]
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total_ms / self.count, 2) if self.count else 0,
+            "p50_ms": self.percentile(0.5),
+            "p95_ms": self.percentile(0.95),
+            "max_ms": round(self.max_ms, 2),
+            "buckets": dict(zip(labels, self.buckets)),
+        }
+
+
+class Metrics:
+    def __init__(self) -> None:
+        self.started_at = time.time()
+        self.requests: Counter[str] = Counter()
+        self.errors: Counter[str] = Counter()
+        self.request_latency: defaultdict[str, Histogram] = defaultdict(Histogram)
+        self.deduplicated: Counter[str] = Counter()
+        self.calls: Counter[str] = Counter()
+        self.call_latency: defaultdict[str, Histogram] = defaultdict(Histogram)
+        self.composes: Counter[str] = Counter()
+        self.renders: Counter[str] = Counter()
+
+        self._lock = threading.Lock()
+
+    def observe_request(self, endpoint: str, seconds: float, failed: bool) -> None:
+        with self._lock:
+            self.requests[endpoint] += 1
+            self.request_latency[endpoint].observe(seconds * 1000)
+            if failed:
+                self.errors[endpoint] += 1
+
+    def observe_deduplicated(self, endpoint: str) -> None:
+        with self._lock:
+            self.deduplicated[endpoint] += 1
+
+    def observe_call(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self.calls[name] += 1
+            self.call_latency[name].observe(seconds * 1000)
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "time": time.time(),
+                "uptime_sec": round(time.time() - self.started_at, 1),
+                "threads": threading.active_count(),
+                "requests": {
+                    endpoint: {
+                        "errors": self.errors[endpoint],
+                        "deduplicated": self.deduplicated[endpoint],
+                        **self.request_latency[endpoint].to_dict(),
+                    }
+                    for endpoint in sorted(self.requests)
+                },
+                "calls": {
+                    name: self.call_latency[name].to_dict()
+                    for name in sorted(self.calls)
+                },
+                "composes": dict(self.composes),
+                "renders": dict(self.renders),
+            }
+
+
+metrics = Metrics()
+
+
+def endpoint_name(method: str, url: str, base_url: str) -> str:
+    if not url.startswith(base_url):
+        return f"{method} {urlsplit(url).netloc}"
+
+    path = urlsplit(url).path
+    if not path.startswith("/api/"):
+        # uploads and avatars, one row for all of them
+        return f"{method} /{path.split('/')[1]}"
+
+    return f"{method} {_ID_SEGMENT.sub('/:id', path)}"
+
+
+def hit_rates(stats: dict[str, dict[str, int]]) -> dict[str, dict[str, Any]]:
+    rates = {}
+    for name, cache in stats.items():
+        lookups = cache["hits"] + cache["misses"]
+        rates[name] = {
+            **cache,
+            "hit_rate": round(cache["hits"] / lookups, 3) if lookups else None,
+        }
+
+    return rates
+
+
+def timed(function: F) -> F:
+    name = function.__qualname__
+
+    if inspect.isasyncgenfunction(function):
+
+        @functools.wraps(function)
+        async def timed_generator(*args: Any, **kwargs: Any) -> Any:
+            started = time.perf_counter()
+            try:
+                async for item in function(*args, **kwargs):
+                    yield item
+            finally:
+                metrics.observe_call(name, time.perf_counter() - started)
+
+        return timed_generator  # type: ignore[return-value]
+
+    if inspect.iscoroutinefunction(function):
+
+        @functools.wraps(function)
+        async def timed_coroutine(*args: Any, **kwargs: Any) -> Any:
+            started = time.perf_counter()
+            try:
+                return await function(*args, **kwargs)
+            finally:
+                metrics.observe_call(name, time.perf_counter() - started)
+
+        return timed_coroutine  # type: ignore[return-value]
+
+    @functools.wraps(function)
+    def timed_function(*args: Any, **kwargs: Any) -> Any:
+        started = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            metrics.observe_call(name, time.perf_counter() - started)
+
+    return timed_function  # type: ignore[return-value]
+
+
+def counted_compose(compose: F) -> F:
+    @functools.wraps(compose)
+    def wrapper(self: Any) -> Any:
+        metrics.composes[type(self).__name__] += 1
+        return compose(self)
+
+    return wrapper  # type: ignore[return-value]
+
+
+def counted_render(render: F) -> F:
+    @functools.wraps(render)
+    def wrapper(self: Any) -> Any:
+        metrics.renders[type(self).__name__] += 1
+        return render(self)
+
+    return wrapper  # type: ignore[return-value]
+
+
+def dump_metrics(path: str, snapshot: dict[str, Any]) -> None:
+    # one json object per line so a crashed session still leaves valid lines
+    try:
+        with open(path, "a") as f:
+            f.write(json.dumps(snapshot) + "\n")
+    except OSError:
+        pass
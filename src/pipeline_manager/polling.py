@@ -0,0 +1,20 @@
+from typing import TypeAlias
+
+from .gitlab_api import Config, MultiProjectPoller, PipelinePoller
+from .graphql_api import GraphQLMultiProjectPoller, GraphQLPipelinePoller
+
+Poller: TypeAlias = PipelinePoller | MultiProjectPoller
+
+
+def build_poller(projects: dict[int, str]) -> Poller:
+    if Config.BACKEND == "graphql":
+        pollers = [GraphQLPipelinePoller(id, path) for id, path in projects.items()]
+        if len(pollers) == 1:
+            return pollers[0]
+
+        return GraphQLMultiProjectPoller(pollers)
+
+    if len(projects) == 1:
+        return PipelinePoller(next(iter(projects)))
+
+    return MultiProjectPoller([PipelinePoller(id) for id in projects])
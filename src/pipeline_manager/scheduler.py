@@ -0,0 +1,147 @@
+import asyncio
+import heapq
+import itertools
+import time
+from email.utils import parsedate_to_datetime
+from enum import IntEnum
+from typing import Hashable, Mapping
+
+
+# lower value is served first
+class Priority(IntEnum):
+    LIST_POLL = 0
+    VISIBLE_ROW = 1
+    OFFSCREEN_ROW = 2
+    AVATAR = 3
+
+
+# used when a 429 comes without a Retry-After we can read
+DEFAULT_RETRY_AFTER_SEC = 1.0
+
+
+def retry_after_sec(value: str | None, now: float) -> float:
+    # delay-seconds or an HTTP-date, both are allowed and proxies send the latter
+    if value is None:
+        return DEFAULT_RETRY_AFTER_SEC
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - now)
+    except (TypeError, ValueError):
+        return DEFAULT_RETRY_AFTER_SEC
+
+
+class RequestScheduler:
+    def __init__(
+        self,
+        max_concurrency: int,
+        reserve: int = 5,
+        slow_down_below: int = 100,
+    ) -> None:
+        self.max_concurrency = max_concurrency
+        # requests we never spend, so the user's other tools keep some headroom
+        self.reserve = reserve
+        self.slow_down_below = slow_down_below
+
+        self.active = 0
+        self.remaining: int | None = None
+        self.resume_at = 0.0
+        self.spacing = 0.0
+        self.next_start_at = 0.0
+        self.throttled = 0
+
+        self._counter = itertools.count()
+        self._waiters: list[tuple[int, int, asyncio.Future[None], Hashable | None]] = []
+        self._wakeup: asyncio.TimerHandle | None = None
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(1 for _, _, future, _ in self._waiters if not future.done())
+
+    def _dispatch(self) -> None:
+        self._wakeup = None
+
+        while self.active < self.max_concurrency and len(self._waiters) > 0:
+            _, _, future, _ = self._waiters[0]
+            if future.done():
+                heapq.heappop(self._waiters)
+                continue
+
+            now = time.time()
+            start_at = max(self.resume_at, self.next_start_at)
+            if start_at > now:
+                self.throttled += 1
+                loop = asyncio.get_running_loop()
+                self._wakeup = loop.call_later(start_at - now, self._dispatch)
+                return
+
+            heapq.heappop(self._waiters)
+            self.active += 1
+            self.next_start_at = now + self.spacing
+            future.set_result(None)
+
+    async def acquire(self, priority: Priority, key: Hashable | None = None) -> None:
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._counter), future, key))
+
+        if self._wakeup is None:
+            self._dispatch()
+
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+
+    def promote(self, key: Hashable, priority: Priority) -> None:
+        # someone more urgent now waits on the same request, move it up the queue
+        self._waiters = [
+            (
+                (priority, count, future, k)
+                if k == key and priority < waiting and not future.done()
+                else (waiting, count, future, k)
+            )
+            for waiting, count, future, k in self._waiters
+        ]
+        heapq.heapify(self._waiters)
+
+        if self._wakeup is None:
+            self._dispatch()
+
+    def release(self) -> None:
+        self.active -= 1
+
+        if self._wakeup is None:
+            self._dispatch()
+
+    def observe(self, status: int, headers: Mapping[str, str]) -> None:
+        now = time.time()
+
+        retry_after = headers.get("Retry-After")
+        if status == 429 or retry_after is not None:
+            self.resume_at = max(
+                self.resume_at, now + retry_after_sec(retry_after, now)
+            )
+            return
+
+        remaining = headers.get("RateLimit-Remaining")
+        reset = headers.get("RateLimit-Reset")
+        if remaining is None or reset is None:
+            return
+
+        self.remaining = int(remaining)
+        window = max(0.0, float(reset) - now)
+
+        if self.remaining <= self.reserve:
+            self.resume_at = max(self.resume_at, now + window)
+            self.spacing = 0.0
+        elif self.remaining < self.slow_down_below:
+            # spread what is left evenly over the rest of the window
+            self.spacing = window / (self.remaining - self.reserve)
+        else:
+            self.spacing = 0.0
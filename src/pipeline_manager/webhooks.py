@@ -0,0 +1,143 @@
+import hmac
+import logging
+from typing import Any, Callable
+
+from aiohttp import web
+
+from .data import parse_timestamp
+from .gitlab_api import Config, slim_job
+
+log = logging.getLogger(__name__)
+
+PIPELINE_EVENT = "Pipeline Hook"
+JOB_EVENT = "Job Hook"
+
+
+def hook_time(value: str | None) -> str | None:
+    # hooks send "2025-01-31 10:00:00 UTC" where the api sends iso 8601
+    if value is None or not value.endswith(" UTC"):
+        return value
+
+    return value[: -len(" UTC")].replace(" ", "T") + "Z"
+
+
+def event_time(payload: dict[str, Any]) -> str | None:
+    # pipeline hooks carry no updated_at, take the latest moment the payload names
+    attributes = payload["object_attributes"]
+    moments = [attributes.get("created_at"), attributes.get("finished_at")]
+    for build in payload.get("builds", []):
+        moments += [
+            build.get(key) for key in ("created_at", "started_at", "finished_at")
+        ]
+
+    times = [hook_time(moment) for moment in moments if moment is not None]
+    return max(times, key=lambda value: parse_timestamp(value) or 0, default=None)
+
+
+def pipeline_event_to_raw(payload: dict[str, Any]) -> dict[str, Any]:
+    attributes = payload["object_attributes"]
+    project = payload["project"]
+
+    return {
+        "id": attributes["id"],
+        "iid": attributes.get("iid"),
+        "project_id": project["id"],
+        "sha": attributes["sha"],
+        "ref": attributes["ref"],
+        "status": attributes["status"],
+        "source": attributes["source"],
+        "created_at": hook_time(attributes["created_at"]),
+        "updated_at": event_time(payload),
+        "web_url": attributes.get("url")
+        or f"{project['web_url']}/-/pipelines/{attributes['id']}",
+        "name": attributes.get("name"),
+    }
+
+
+def pipeline_event_to_raw_jobs(payload: dict[str, Any]) -> list[dict[str, Any]]:
+    attributes = payload["object_attributes"]
+
+    return [
+        slim_job(
+            {
+                **build,
+                "ref": attributes["ref"],
+                "tag": attributes.get("tag", False),
+                "created_at": hook_time(build.get("created_at")),
+                "started_at": hook_time(build.get("started_at")),
+                "finished_at": hook_time(build.get("finished_at")),
+            }
+        )
+        for build in payload.get("builds", [])
+    ]
+
+
+def job_event_to_raw(payload: dict[str, Any]) -> dict[str, Any]:
+    return slim_job(
+        {
+            "id": payload["build_id"],
+            "status": payload["build_status"],
+            "stage": payload["build_stage"],
+            "name": payload["build_name"],
+            "ref": payload["ref"],
+            "tag": payload.get("tag", False),
+            "allow_failure": payload.get("build_allow_failure", False),
+            "created_at": hook_time(payload.get("build_created_at")),
+            "started_at": hook_time(payload.get("build_started_at")),
+            "finished_at": hook_time(payload.get("build_finished_at")),
+            "duration": payload.get("build_duration"),
+            "queued_duration": payload.get("build_queued_duration"),
+        }
+    )
+
+
+class WebhookReceiver:
+    def __init__(
+        self,
+        on_pipeline: Callable[[dict[str, Any], list[dict[str, Any]]], None],
+        on_job: Callable[[int, dict[str, Any]], None],
+        secret: str = Config.WEBHOOK_SECRET,
+    ) -> None:
+        self.on_pipeline = on_pipeline
+        self.on_job = on_job
+        self.secret = secret
+        self.received = 0
+
+        self.app = web.Application()
+        self.app.router.add_post("/", self.handle)
+        self.runner: web.AppRunner | None = None
+
+    async def handle(self, request: web.Request) -> web.Response:
+        token = request.headers.get("X-Gitlab-Token", "")
+        if self.secret != "" and not hmac.compare_digest(token, self.secret):
+            return web.Response(status=401)
+
+        event = request.headers.get("X-Gitlab-Event")
+        if event not in (PIPELINE_EVENT, JOB_EVENT):
+            return web.Response(status=204)
+
+        payload = await request.json()
+        self.received += 1
+
+        if event == PIPELINE_EVENT:
+            self.on_pipeline(
+                pipeline_event_to_raw(payload), pipeline_event_to_raw_jobs(payload)
+            )
+        else:
+            self.on_job(payload["pipeline_id"], job_event_to_raw(payload))
+
+        return web.Response(status=200)
+
+    async def start(
+        self, host: str = Config.WEBHOOK_HOST, port: int = Config.WEBHOOK_PORT
+    ) -> None:
+        self.runner = web.AppRunner(self.app, access_log=None)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, host, port).start()
+
+        log.info("Listening for webhooks on %s:%s", host, port)
+
+    async def stop(self) -> None:
+        if self.runner is not None:
+            await self.runner.cleanup()
+            self.runner = None
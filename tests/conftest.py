@@ -0,0 +1,92 @@
+import asyncio
+import os
+import shutil
+import socket
+import tempfile
+from pathlib import Path
+from typing import Awaitable, Callable, Iterator, TypeVar
+
+import pytest
+from aiohttp.test_utils import TestServer
+
+from benchmarks.e2e import start_fake_gitlab
+from benchmarks.fake_gitlab import PROJECT_PATH, FakeGitLab, Scenario
+
+T = TypeVar("T")
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+# Config and the caches read the environment once, on first import, which can
+# be any test module, so it is set before those are collected
+GITLAB_PORT = free_port()
+CACHE_DIR = tempfile.mkdtemp(prefix="pipeline-manager-tests-")
+os.environ.update(
+    {
+        "GITLAB_HOST": f"http://127.0.0.1:{GITLAB_PORT}",
+        "GITLAB_TOKEN": "test",
+        "PIPELINE_MANAGER_PROJECTS": PROJECT_PATH,
+        "PIPELINE_MANAGER_CACHE_DIR": CACHE_DIR,
+        "PIPELINE_MANAGER_SOCKET": os.path.join(CACHE_DIR, "collector.sock"),
+    }
+)
+
+
+@pytest.fixture(scope="session", autouse=True)
+def cache_dir() -> Iterator[str]:
+    try:
+        yield CACHE_DIR
+    finally:
+        shutil.rmtree(CACHE_DIR, ignore_errors=True)
+
+
+@pytest.fixture(scope="session")
+def gitlab_url() -> Iterator[str]:
+    server, url = start_fake_gitlab(
+        ["--port", str(GITLAB_PORT), "--pipelines", "60", "--running", "2"]
+    )
+    assert url == os.environ["GITLAB_HOST"]
+
+    try:
+        yield url
+    finally:
+        server.terminate()
+        server.wait()
+
+
+class StandIn:
+    # a stand-in and cache of its own, for tests that change what gitlab serves
+    def __init__(self, monkeypatch: pytest.MonkeyPatch, cache_dir: Path) -> None:
+        from src.pipeline_manager import gitlab_api
+        from src.pipeline_manager.cache import DiskCache
+
+        self.monkeypatch = monkeypatch
+        self.url = ""
+        self.fake = FakeGitLab(Scenario(pipelines=60, running=2))
+        monkeypatch.setattr(gitlab_api, "disk_cache", DiskCache(str(cache_dir)))
+
+    def run(self, main: Callable[[], Awaitable[T]]) -> T:
+        from src.pipeline_manager import collector, gitlab_api, graphql_api
+        from src.pipeline_manager.engine import FetchEngine
+
+        async def serve() -> T:
+            async with TestServer(self.fake.build_app()) as server:
+                self.url = str(server.make_url("")).rstrip("/")
+                engine = FetchEngine(self.url, "test", 4, 4)
+                for module in (gitlab_api, graphql_api, collector):
+                    self.monkeypatch.setattr(module, "engine", engine)
+                try:
+                    return await main()
+                finally:
+                    await engine.close()
+
+        return asyncio.run(serve())
+
+
+@pytest.fixture
+def stand_in(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> StandIn:
+    return StandIn(monkeypatch, tmp_path)
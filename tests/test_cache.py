@@ -0,0 +1,112 @@
+import os
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from src.pipeline_manager.cache import DiskCache, DiskLimit, MemoryCache
+
+
+def age(disk: DiskCache, namespace: str, key: str, seconds: float) -> None:
+    used_at = time.time() - seconds
+    os.utime(disk._path(namespace, key), (used_at, used_at))
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> list[float]:
+    now = [time.time()]
+    monkeypatch.setattr(time, "time", lambda: now[0])
+    return now
+
+
+def test_the_least_recently_used_entry_is_evicted():
+    cache = MemoryCache(2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats() == {"entries": 2, "hits": 3, "misses": 1, "evictions": 1}
+
+
+def test_entries_expire_after_their_ttl(clock: list[float]):
+    cache = MemoryCache(8, ttl=10)
+    cache.set("a", 1)
+    cache.set("b", 2, ttl=None)
+    cache.set("c", 3, ttl=30)
+
+    clock[0] += 20
+
+    assert cache.get("a") is None
+    assert cache.get("b") == 2
+    assert cache.get("c") == 3
+    assert len(cache) == 2
+    assert (cache.hits, cache.misses) == (2, 1)
+
+
+def test_disk_cache_keeps_the_recently_used_within_its_size(tmp_path: Path):
+    # limited only once written, or the first write would prune in the background
+    disk = DiskCache(str(tmp_path))
+    for index, key in enumerate(["a", "b", "c"]):
+        disk.set("avatars", key, b"x" * 1000)
+        age(disk, "avatars", key, 300 - index * 100)
+    disk.limits = {"avatars": DiskLimit(max_bytes=2500)}
+
+    # reading it makes it the most recently used
+    assert disk.get("avatars", "a") is not None
+    assert disk.prune("avatars") == 1
+
+    assert disk.get("avatars", "a") is not None
+    assert disk.get("avatars", "b") is None
+    assert disk.get("avatars", "c") is not None
+
+
+def test_disk_cache_drops_what_nobody_used_for_too_long(tmp_path: Path):
+    disk = DiskCache(str(tmp_path))
+    disk.set("commits", "old", {"id": "old"})
+    disk.set("commits", "new", {"id": "new"})
+    age(disk, "commits", "old", 120)
+    disk.limits = {"commits": DiskLimit(max_bytes=1_000_000, max_idle_sec=60)}
+
+    assert disk.prune("commits") == 1
+    assert disk.get("commits", "old") is None
+    assert disk.get("commits", "new") is not None
+
+
+def test_disk_cache_prunes_on_the_first_write_of_a_session(tmp_path: Path):
+    DiskCache(str(tmp_path)).set("jobs", "stale", [])
+    disk = DiskCache(str(tmp_path), {"jobs": DiskLimit(max_bytes=0)})
+
+    disk.set("jobs", "fresh", [])
+    for thread in threading.enumerate():
+        if thread is not threading.current_thread() and thread.daemon:
+            thread.join(timeout=1)
+
+    assert disk.pruned == 2
+
+
+def test_users_from_disk_expire_with_the_same_ttl(clock: list[float]):
+    from src.pipeline_manager.gitlab_api import (
+        UNKNOWN_USER,
+        Config,
+        get_cached_user,
+        store_user,
+    )
+
+    store_user("alice", {"username": "alice"})
+    store_user("nobody", None)
+    assert get_cached_user("alice") == {"username": "alice"}
+    assert get_cached_user("nobody") is UNKNOWN_USER
+
+    clock[0] += Config.USER_TTL_SEC / 2
+    assert get_cached_user("alice") == {"username": "alice"}
+
+    # the disk copy does not give the memory entry a second life
+    clock[0] += Config.USER_TTL_SEC / 2 + 1
+    assert get_cached_user("alice") is None
+    assert get_cached_user("nobody") is None
@@ -0,0 +1,97 @@
+import asyncio
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from benchmarks.fake_gitlab import PROJECT_ID
+
+
+@pytest.fixture
+def collector(stand_in: Any) -> Any:
+    from src.pipeline_manager.collector import Collector
+    from src.pipeline_manager.gitlab_api import PipelinePoller
+
+    return Collector(PipelinePoller(PROJECT_ID))
+
+
+def test_clients_share_requests_and_get_errors_back(
+    stand_in: Any, collector: Any, tmp_path: Path
+):
+    from src.pipeline_manager.collector import CollectorClient
+    from src.pipeline_manager.engine import FetchError
+    from src.pipeline_manager.scheduler import Priority
+
+    async def main() -> None:
+        path = str(tmp_path / "collector.sock")
+        async with await asyncio.start_unix_server(collector.handle_client, path):
+            clients = [await CollectorClient.connect(path) for _ in range(2)]
+
+            async def get(client: Any, path: str) -> Any:
+                return await client.request(
+                    f"{stand_in.url}/api/v4{path}",
+                    None,
+                    None,
+                    Priority.VISIBLE_ROW,
+                    "GET",
+                    None,
+                )
+
+            pipeline = f"/projects/{PROJECT_ID}/pipelines/60"
+            responses = await asyncio.gather(*(get(c, pipeline) for c in clients))
+            assert [response.json()["id"] for response in responses] == [60, 60]
+            assert sum(stand_in.fake.requests.values()) == 1
+
+            with pytest.raises(FetchError) as error:
+                await get(clients[0], "/nowhere")
+            assert error.value.status == 404
+
+            for client in clients:
+                await client.close()
+
+    stand_in.run(main)
+
+
+def test_subscribers_get_running_jobs_before_the_list(
+    stand_in: Any, collector: Any, tmp_path: Path
+):
+    from src.pipeline_manager.collector import CollectorClient
+
+    async def main() -> None:
+        await collector.poller.poll()
+        running = sorted(
+            raw["id"]
+            for raw in collector.poller.get_pipelines()
+            if raw["status"] == "running"
+        )
+        assert len(running) == 2
+
+        path = str(tmp_path / "collector.sock")
+        async with await asyncio.start_unix_server(collector.handle_client, path):
+            first = await CollectorClient.connect(path)
+            events = first.subscribe()
+            snapshot = await anext(events)
+            assert snapshot["op"] == "pipelines"
+            assert len(snapshot["pipelines"]) == 20
+
+            # one poll here stands in for every attached ui's rows
+            await collector.poll_active()
+            jobs = [await anext(events) for _ in running]
+            assert sorted(event["pipeline_id"] for event in jobs) == running
+            assert all(len(event["jobs"]) == 12 for event in jobs)
+
+            # nothing changed, so nothing is sent again
+            await collector.poll_active()
+            await asyncio.sleep(0.05)
+            assert first.events.empty()
+
+            # a late ui starts from the same state
+            second = await CollectorClient.connect(path)
+            late = second.subscribe()
+            ops = [(await anext(late))["op"] for _ in range(len(running) + 1)]
+            assert ops == ["jobs", "jobs", "pipelines"]
+
+            for client in (first, second):
+                await client.close()
+
+    stand_in.run(main)
@@ -0,0 +1,65 @@
+from typing import Any
+
+from src.pipeline_manager.data import StatusHierarchy
+from src.pipeline_manager.mappers import raw_jobs_to_jobs
+
+
+def raw_job(job_id: int, stage: str, status: str, retried: bool = False) -> Any:
+    return {
+        "id": job_id,
+        "status": status,
+        "stage": stage,
+        "name": f"{stage}-{job_id}",
+        "ref": "main",
+        "tag": False,
+        "coverage": None,
+        "allow_failure": False,
+        "created_at": None,
+        "started_at": None,
+        "finished_at": None,
+        "erased_at": None,
+        "duration": None,
+        "queued_duration": None,
+        "retried": retried,
+    }
+
+
+def stage_names(jobs: Any) -> list[str]:
+    return [stage.name for stage in jobs.order]
+
+
+def test_retried_jobs_place_their_stage_but_do_not_count():
+    jobs = raw_jobs_to_jobs(
+        [
+            raw_job(4, "build", "success"),
+            raw_job(3, "deploy", "success"),
+            raw_job(2, "test", "success"),
+            raw_job(1, "build", "failed", retried=True),
+        ]
+    )
+
+    assert stage_names(jobs) == ["build", "test", "deploy"]
+    assert jobs.stages["build"].status == StatusHierarchy.SUCCESS
+    assert sorted(job.id for job in jobs) == [2, 3, 4]
+
+
+def test_a_job_turning_retried_leaves_the_counts():
+    jobs = raw_jobs_to_jobs(
+        [raw_job(1, "build", "failed"), raw_job(2, "test", "success")]
+    )
+    raw_jobs_to_jobs(
+        [raw_job(1, "build", "failed", retried=True), raw_job(3, "build", "running")],
+        into=jobs,
+    )
+
+    assert stage_names(jobs) == ["build", "test"]
+    assert jobs.stages["build"].status == StatusHierarchy.RUNNING
+    assert 1 not in jobs.by_id
+
+
+def test_without_retried_jobs_stages_follow_the_lowest_id():
+    jobs = raw_jobs_to_jobs(
+        [raw_job(4, "build", "success"), raw_job(2, "test", "success")]
+    )
+
+    assert stage_names(jobs) == ["test", "build"]
@@ -0,0 +1,83 @@
+import asyncio
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from src.pipeline_manager.engine import FetchEngine
+from src.pipeline_manager.scheduler import Priority, RequestScheduler
+
+
+def test_the_last_waiter_leaving_cancels_the_request(gitlab_url: str):
+    async def main() -> None:
+        engine = FetchEngine(gitlab_url, "test", 1, 1)
+        # every slot is taken, so the request waits in the scheduler
+        engine.scheduler.active = 1
+
+        first = asyncio.ensure_future(engine.get_json("/users"))
+        second = asyncio.ensure_future(engine.get_json("/users"))
+        await asyncio.sleep(0)
+        (shared,) = engine._in_flight.values()
+        assert shared.waiters == 2
+
+        first.cancel()
+        await asyncio.sleep(0)
+        assert not shared.task.done()
+
+        second.cancel()
+        await asyncio.wait([shared.task])
+        assert shared.task.cancelled()
+        assert engine._in_flight == {}
+        assert engine.scheduler.queue_depth == 0
+        await engine.close()
+
+    asyncio.run(main())
+
+
+def test_a_more_urgent_waiter_promotes_the_shared_request():
+    async def main() -> None:
+        scheduler = RequestScheduler(1)
+        scheduler.active = 1
+        served: list[str] = []
+
+        async def acquire(name: str, priority: Priority, key: str) -> None:
+            await scheduler.acquire(priority, key)
+            served.append(name)
+
+        waiters = [
+            asyncio.ensure_future(acquire("avatar", Priority.AVATAR, "avatar")),
+            asyncio.ensure_future(acquire("row", Priority.OFFSCREEN_ROW, "row")),
+        ]
+        await asyncio.sleep(0)
+
+        scheduler.promote("avatar", Priority.VISIBLE_ROW)
+        for _ in waiters:
+            scheduler.release()
+            await asyncio.sleep(0)
+
+        assert served == ["avatar", "row"]
+
+    asyncio.run(main())
+
+
+def test_a_429_is_retried_after_the_pause():
+    responses = [
+        web.Response(status=429, headers={"Retry-After": "0"}),
+        web.json_response([{"id": 1}]),
+    ]
+
+    async def handler(request: web.Request) -> web.Response:
+        return responses.pop(0)
+
+    async def main() -> None:
+        app = web.Application()
+        app.router.add_get("/api/v4/users", handler)
+        async with TestServer(app) as server:
+            engine = FetchEngine(str(server.make_url("")), "test", 1, 1)
+            try:
+                assert await engine.get_json("/users") == [{"id": 1}]
+            finally:
+                await engine.close()
+
+        assert responses == []
+
+    asyncio.run(main())
@@ -0,0 +1,101 @@
+import sys
+from typing import Any
+
+import pytest
+
+from benchmarks.fake_gitlab import PROJECT_ID, PROJECT_PATH
+
+
+def raw(pipeline_id: int, updated_at: str, status: str = "success") -> Any:
+    return {
+        "id": pipeline_id,
+        "iid": pipeline_id,
+        "project_id": PROJECT_ID,
+        "sha": f"{pipeline_id:040x}",
+        "ref": "main",
+        "status": status,
+        "source": "push",
+        "created_at": "00",
+        "updated_at": updated_at,
+        "web_url": f"https://gitlab.example.com/-/pipelines/{pipeline_id}",
+        "name": None,
+    }
+
+
+@pytest.fixture
+def poller(stand_in: Any) -> Any:
+    from src.pipeline_manager.gitlab_api import PipelinePoller
+
+    return PipelinePoller(PROJECT_ID, depth=20)
+
+
+def test_an_incremental_poll_merges_only_what_changed(poller: Any):
+    poller.apply([raw(2, "01"), raw(1, "01")], full_sync=True)
+
+    assert poller.apply([raw(2, "01")], full_sync=False) is False
+    assert poller.apply([raw(1, "02", "failed")], full_sync=False) is True
+
+    assert poller.get_pipelines() == [raw(2, "01"), raw(1, "02", "failed")]
+    assert poller.newest_updated_at == "02"
+
+
+def test_a_full_sync_drops_what_the_head_page_no_longer_lists(poller: Any):
+    poller.apply([raw(5, "01"), raw(4, "01"), raw(3, "01")], full_sync=True)
+    poller.raw_pipelines[1] = raw(1, "01")
+
+    # 4 was deleted, 1 is older than the head page and stays
+    assert poller.apply([raw(5, "01"), raw(3, "01")], full_sync=True) is True
+    assert sorted(poller.raw_pipelines) == [1, 3, 5]
+
+
+def test_stored_pipelines_keep_only_what_gets_mapped(poller: Any):
+    from src.pipeline_manager.gitlab_api import get_cached_commit, store_commit
+
+    payload = {**raw(1, "01"), "user": {"name": "someone"}, "ref": "".join("main")}
+    poller.apply([payload], full_sync=True)
+
+    stored = poller.raw_pipelines[1]
+    assert "user" not in stored
+    assert stored["ref"] is sys.intern("main")
+
+    store_commit({"id": "abc", "author_name": "Ada", "last_pipeline": payload})
+    commit = get_cached_commit("abc")
+    assert commit is not None
+    assert commit["last_pipeline"] == raw(1, "01")
+
+
+def test_changes_past_the_history_depth_are_not_a_change(poller: Any):
+    poller.apply([raw(key, "01") for key in range(40, 20, -1)], full_sync=True)
+
+    assert poller.apply([raw(3, "02")], full_sync=False) is False
+    assert 3 not in poller.raw_pipelines
+
+
+@pytest.mark.parametrize("backend", ["rest", "graphql"])
+def test_a_poll_picks_up_every_changed_pipeline(stand_in: Any, backend: str):
+    from src.pipeline_manager.gitlab_api import PipelinePoller
+    from src.pipeline_manager.graphql_api import GraphQLPipelinePoller
+
+    poller = (
+        PipelinePoller(PROJECT_ID)
+        if backend == "rest"
+        else GraphQLPipelinePoller(PROJECT_ID, PROJECT_PATH)
+    )
+
+    async def main() -> None:
+        await poller.poll()
+        async for _ in poller.iter_history():
+            pass
+        assert len(poller.raw_pipelines) == 60
+
+        # far more than one page changes while we back off
+        stand_in.fake.touch()
+        assert await poller.poll() is True
+
+        served = {p["id"]: p["updated_at"] for p in stand_in.fake.pipelines}
+        stored = {key: p["updated_at"] for key, p in poller.raw_pipelines.items()}
+        assert stored == served
+
+        assert await poller.poll() is False
+
+    stand_in.run(main)
@@ -0,0 +1,121 @@
+import asyncio
+from typing import Any, Awaitable, TypeVar
+from urllib.request import Request, urlopen
+
+import pytest
+
+from benchmarks.fake_gitlab import PROJECT_ID, PROJECT_PATH
+
+T = TypeVar("T")
+
+
+@pytest.fixture(scope="module")
+def api(gitlab_url: str) -> Any:
+    from src.pipeline_manager import graphql_api
+
+    return graphql_api
+
+
+def run(api: Any, coroutine: Awaitable[T]) -> T:
+    # the engine's session belongs to the loop that opened it
+    async def main() -> T:
+        try:
+            return await coroutine
+        finally:
+            await api.engine.close()
+
+    return asyncio.run(main())
+
+
+def tick(gitlab_url: str) -> None:
+    urlopen(Request(f"{gitlab_url}/_tick", method="POST")).read()
+
+
+def test_head_page_maps_pipelines_and_seeds_caches(api: Any, gitlab_url: str):
+    from src.pipeline_manager.data import StatusHierarchy
+    from src.pipeline_manager.gitlab_api import (
+        get_cached_commit,
+        get_cached_pipeline_jobs,
+        get_cached_user,
+    )
+    from src.pipeline_manager.mappers import (
+        raw_commit_to_commit,
+        raw_jobs_to_jobs,
+        raw_pipeline_to_pipeline,
+    )
+
+    poller = api.GraphQLPipelinePoller(PROJECT_ID, PROJECT_PATH)
+    assert run(api, poller.poll()) is True
+
+    pipelines = raw_pipeline_to_pipeline(poller.get_pipelines())
+    assert [p.id for p in pipelines] == list(range(60, 40, -1))
+    assert poller.head_cursor is not None
+
+    newest = pipelines[0]
+    assert newest.project_id == PROJECT_ID
+    assert newest.status == StatusHierarchy.RUNNING
+    assert newest.ref in ("main", "develop", "feature/a")
+    assert newest.web_url == f"{gitlab_url}/{PROJECT_PATH}/-/pipelines/60"
+    assert newest.updated_at - newest.created_at == pytest.approx(30)
+    assert newest.is_latest
+
+    raw_commit = get_cached_commit(newest.sha)
+    assert raw_commit is not None
+    commit = raw_commit_to_commit(raw_commit)
+    assert commit.id == newest.sha
+    assert commit.title == f"Change {newest.sha[:6]}"
+
+    user = get_cached_user(commit.author_name)
+    assert user is not None
+    assert user["avatar_url"] == f"{gitlab_url}/avatars/{commit.author_name}.png"
+
+    entry = get_cached_pipeline_jobs(newest.id)
+    assert entry is not None
+    assert entry.meta["pipeline_updated_at"] == newest.updated_at
+
+    jobs = raw_jobs_to_jobs(entry.value)
+    assert len(jobs) == 12
+    assert [stage.name for stage in jobs.order] == ["build", "test", "lint", "deploy"]
+    assert all(job.started_at == newest.created_at for job in jobs)
+
+
+def test_updated_after_poll_only_reports_real_changes(api: Any, gitlab_url: str):
+    poller = api.GraphQLPipelinePoller(PROJECT_ID, PROJECT_PATH)
+    run(api, poller.poll())
+    assert poller.newest_updated_at is not None
+
+    # updatedAfter is inclusive, the newest pipeline alone is not a change
+    assert not poller.needs_full_sync()
+    assert run(api, poller.poll()) is False
+
+    running = [
+        raw["id"] for raw in poller.get_pipelines() if raw["status"] == "running"
+    ]
+    tick(gitlab_url)
+    assert run(api, poller.poll()) is True
+
+    by_id = {raw["id"]: raw for raw in poller.get_pipelines()}
+    assert by_id[61]["status"] == "running"
+    assert by_id[max(running)]["status"] == "success"
+    assert poller.newest_updated_at == by_id[61]["updated_at"]
+
+
+def test_history_continues_from_the_head_cursor(api: Any, gitlab_url: str):
+    from src.pipeline_manager.gitlab_api import get_cached_commit
+
+    poller = api.GraphQLPipelinePoller(PROJECT_ID, PROJECT_PATH, depth=50)
+
+    async def load() -> list[list[dict[str, Any]]]:
+        await poller.poll()
+        return [page async for page in poller.iter_history()]
+
+    pages = run(api, load())
+    assert len(pages) > 0
+
+    ids = [raw["id"] for raw in poller.get_pipelines()]
+    assert len(ids) == 50
+    assert ids == sorted(set(ids), reverse=True)
+    assert ids == list(range(ids[0], ids[0] - 50, -1))
+
+    oldest = poller.get_pipelines()[-1]
+    assert get_cached_commit(oldest["sha"]) is not None
@@ -0,0 +1,66 @@
+import time
+from email.utils import formatdate
+
+import pytest
+
+from src.pipeline_manager.scheduler import (
+    DEFAULT_RETRY_AFTER_SEC,
+    RequestScheduler,
+    retry_after_sec,
+)
+
+
+def rate_limit(remaining: int, reset_in: float) -> dict[str, str]:
+    return {
+        "RateLimit-Remaining": str(remaining),
+        "RateLimit-Reset": str(time.time() + reset_in),
+    }
+
+
+def test_plenty_left_means_no_spacing():
+    scheduler = RequestScheduler(4)
+    scheduler.observe(200, rate_limit(500, 60))
+
+    assert scheduler.remaining == 500
+    assert scheduler.spacing == 0
+    assert scheduler.resume_at < time.time()
+
+
+def test_running_low_spreads_what_is_left_over_the_window():
+    scheduler = RequestScheduler(4, reserve=5, slow_down_below=100)
+    scheduler.observe(200, rate_limit(25, 60))
+
+    # twenty spendable requests over a minute
+    assert scheduler.spacing == pytest.approx(3, abs=0.1)
+
+
+def test_hitting_the_reserve_pauses_until_the_reset():
+    scheduler = RequestScheduler(4, reserve=5)
+    scheduler.observe(200, rate_limit(5, 30))
+
+    assert scheduler.spacing == 0
+    assert scheduler.resume_at - time.time() == pytest.approx(30, abs=1)
+
+
+def test_a_429_pauses_for_the_retry_after():
+    scheduler = RequestScheduler(4)
+    scheduler.observe(429, {"Retry-After": "7"})
+
+    assert scheduler.resume_at - time.time() == pytest.approx(7, abs=1)
+
+
+def test_retry_after_accepts_an_http_date():
+    now = time.time()
+    value = formatdate(now + 20, usegmt=True)
+
+    assert retry_after_sec(value, now) == pytest.approx(20, abs=1)
+    assert retry_after_sec(formatdate(now - 20, usegmt=True), now) == 0
+
+
+def test_unreadable_retry_after_falls_back_to_the_default():
+    assert retry_after_sec("soon", time.time()) == DEFAULT_RETRY_AFTER_SEC
+    assert retry_after_sec(None, time.time()) == DEFAULT_RETRY_AFTER_SEC
+
+    scheduler = RequestScheduler(4)
+    scheduler.observe(503, {"Retry-After": "soon"})
+    assert scheduler.resume_at > time.time()
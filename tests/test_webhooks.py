@@ -0,0 +1,56 @@
+import copy
+import json
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+PAYLOAD = (
+    Path(__file__).parent.parent / "benchmarks" / "payloads" / "pipeline_hook.json"
+)
+
+
+@pytest.fixture
+def poller() -> Any:
+    from src.pipeline_manager.gitlab_api import PipelinePoller
+
+    poller = PipelinePoller(1)
+    poller.raw_pipelines = {}
+    return poller
+
+
+def hook(status: str, finished_at: str | None = None) -> Any:
+    from src.pipeline_manager.webhooks import pipeline_event_to_raw
+
+    payload = copy.deepcopy(json.loads(PAYLOAD.read_text()))
+    payload["object_attributes"]["status"] = status
+    payload["object_attributes"]["finished_at"] = finished_at
+    return pipeline_event_to_raw(payload)
+
+
+def test_updated_at_comes_from_the_payload():
+    raw = hook("running")
+
+    assert raw["created_at"] == "2026-01-01T00:29:00Z"
+    # the latest build transition, not the time the event was received
+    assert raw["updated_at"] == "2026-01-01T00:30:10Z"
+
+
+def test_a_late_running_event_does_not_undo_success(poller: Any):
+    success = hook("success", finished_at="2026-01-01 00:35:00 UTC")
+
+    assert poller.push(success) is not None
+    assert poller.push(hook("running")) is None
+
+    stored = poller.raw_pipelines[success["id"]]
+    assert stored["status"] == "success"
+    assert stored["updated_at"] == "2026-01-01T00:35:00Z"
+
+
+def test_a_duplicate_status_keeps_the_known_updated_at(poller: Any):
+    first = hook("running")
+    poller.push({**first, "updated_at": "2026-01-01T00:30:00.000Z"})
+
+    pushed = poller.push(first)
+    assert pushed is not None
+    assert pushed["updated_at"] == "2026-01-01T00:30:00.000Z"